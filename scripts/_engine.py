@@ -0,0 +1,22 @@
+"""
+Shared engine accessor for the scripts in this folder.
+
+Building a FlowManager loads the SetFit and MiniLM models, which takes
+seconds. get_manager() builds it once per process, so scripts (and REPL or
+notebook sessions that import them) reuse the warm instance.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+
+@lru_cache(maxsize=None)
+def get_manager(project_root=PROJECT_ROOT):
+    """Return the process-wide FlowManager for project_root."""
+    from src.m09_flow_manager import FlowManager
+    return FlowManager(project_root)
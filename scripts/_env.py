@@ -0,0 +1,34 @@
+"""
+Shared .env loader for the scripts in this folder.
+Uses python-dotenv when installed, otherwise a minimal KEY=VALUE parser.
+"""
+
+import os
+
+try:
+    from dotenv import dotenv_values
+    HAS_DOTENV = True
+except ImportError:
+    HAS_DOTENV = False
+
+
+def load_env(path):
+    """
+    Read KEY=VALUE pairs from a .env file.
+
+    Args:
+        path (str): Path to the .env file
+
+    Returns:
+        dict: Parsed variables (empty if the file does not exist)
+    """
+    if not os.path.exists(path):
+        return {}
+    if HAS_DOTENV:
+        return {k: v for k, v in dotenv_values(path).items() if v is not None}
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(
+            line.strip().split("=", 1)
+            for line in f
+            if "=" in line and not line.lstrip().startswith("#")
+        )
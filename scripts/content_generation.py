@@ -3,33 +3,77 @@ import json
 import asyncio
 import re
 import random
+import hashlib
+import datetime
+import time
+import sqlite3
+import argparse
 import google.generativeai as genai
+from google.generativeai import caching
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core import exceptions as api_exceptions
+
+from _env import load_env
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+# The Batch API is only exposed by the newer google-genai SDK
+try:
+    from google import genai as google_genai
+    HAS_BATCH_API = True
+except ImportError:
+    google_genai = None
+    HAS_BATCH_API = False
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
 
-# Load API Key from .env manually
+# Load API Key from .env
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 ENV_PATH = os.path.join(PROJECT_ROOT, ".env")
-GOOGLE_API_KEY = None
-
-if os.path.exists(ENV_PATH):
-    with open(ENV_PATH, "r") as f:
-        for line in f:
-            if line.strip() and not line.startswith("#"):
-                try:
-                    key, value = line.strip().split("=", 1)
-                    if key == "GEMINI_API_KEY":
-                        GOOGLE_API_KEY = value
-                except ValueError:
-                    pass
+GOOGLE_API_KEY = load_env(ENV_PATH).get("GEMINI_API_KEY")
+
+# Configure once at import; every model/cache call below shares this client config
+if GOOGLE_API_KEY:
+    genai.configure(api_key=GOOGLE_API_KEY)
 
 MODEL_NAME = "gemini-2.5-flash"
 OUTPUT_FILE = os.path.join(PROJECT_ROOT, "data", "mood_training_data.json")
+# Append-only per-mood staging files; OUTPUT_FILE is rebuilt from them once at the end
+STAGING_DIR = os.path.join(PROJECT_ROOT, "data", "staging")
 TARGET_PER_MOOD = 500
 BATCH_SIZE = 20
+STYLE_CONCURRENCY = 8  # Max in-flight Gemini calls; keep within the tier's RPM
+RPM_ALLOWANCE = 40     # Requests per minute available to this job
+TPM_ALLOWANCE = 1_000_000  # Tokens per minute available to this job
+EST_TOKENS_PER_EMAIL = 120  # Rough output size, used to budget TPM per request
+GENERATION_CONFIG = {"response_mime_type": "application/json", "temperature": 0.9}
+
+# Context cache for the static prompt prefix (reused across runs while the TTL holds)
+CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache")
+PROMPT_CACHE_ID_FILE = os.path.join(CACHE_DIR, "gemini_prompt_cache_id")
+PROMPT_CACHE_TTL = datetime.timedelta(hours=1)
+# Smallest prefix Gemini will cache for MODEL_NAME; shorter prompts are sent inline
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Local cache of generated batches (lets re-runs replay earlier API results for free)
+BATCH_CACHE_FILE = os.path.join(CACHE_DIR, "batches.sqlite")
+
+# Offline Batch API job (--batch-api)
+BATCH_REQUESTS_FILE = os.path.join(CACHE_DIR, "batch_requests.jsonl")
+BATCH_POLL_SECONDS = 30
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
 
 # ==========================================
 # MOOD LABELS & DEFINITIONS
@@ -71,14 +115,17 @@ STYLES = {
 # ==========================================
 # PROMPT ENGINEERING
 # ==========================================
-def build_prompt(mood, topic, style_name, style_desc, count):
-    return f"""
-    Generate exactly {count} unique customer support emails.
-    
-    TARGET MOOD: "{mood}"
-    TOPIC: "{topic}"
-    WRITING STYLE: "{style_name}" ({style_desc})
-    
+# Static content goes first so the server can reuse it as a cached prefix;
+# only the per-batch mood/topic/style/count is sent with each request.
+STYLE_CATALOGUE = "\n".join(f'    - "{name}": {desc}' for name, desc in STYLES.items())
+
+STATIC_PROMPT = f"""
+    You generate realistic customer support emails used to train a mood classifier.
+    Every request names a TARGET MOOD, a TOPIC, a WRITING STYLE and a count.
+
+    WRITING STYLES:
+{STYLE_CATALOGUE}
+
     CRITICAL INSTRUCTIONS:
     1. **DIVERSITY:** Each email must be unique. Do not repeat phrases.
     2. **REALISM:** 
@@ -93,88 +140,630 @@ def build_prompt(mood, topic, style_name, style_desc, count):
     {{ "emails": ["email text 1", "email text 2"] }}
     """
 
+PROMPT_CACHE_KEY = hashlib.sha256((MODEL_NAME + STATIC_PROMPT).encode("utf-8")).hexdigest()[:12]
+
+
+# Per-batch suffix (the static instructions live in STATIC_PROMPT)
+PROMPT_TEMPLATE = """
+    Generate exactly {count} unique customer support emails.
+    
+    TARGET MOOD: "{mood}"
+    TOPIC: "{topic}"
+    WRITING STYLE: "{style_name}"
+    """
+
+def build_prompt(mood, topic, style_name, count):
+    return PROMPT_TEMPLATE.format_map(
+        {"count": count, "mood": mood, "topic": topic, "style_name": style_name}
+    )
+
+# Every (mood, topic, style) prompt at BATCH_SIZE, built once at import
+PROMPT_TABLE = {
+    (mood, topic, style_name): build_prompt(mood, topic, style_name, BATCH_SIZE)
+    for mood in MOODS for topic in TOPICS for style_name in STYLES
+}
+
+def get_prompt(mood, topic, style_name, count=BATCH_SIZE):
+    """Table lookup for the standard batch size; builds the prompt otherwise."""
+    if count == BATCH_SIZE:
+        prompt = PROMPT_TABLE.get((mood, topic, style_name))
+        if prompt is not None:
+            return prompt
+    return build_prompt(mood, topic, style_name, count)
+
+
+def get_prompt_cache():
+    """
+    Fetch (or create) the Gemini context cache holding STATIC_PROMPT.
+
+    The cache name is persisted to disk so re-runs within the TTL skip
+    re-uploading the prefix. Returns None when caching is unavailable,
+    without a create call when the prefix is below PROMPT_CACHE_MIN_TOKENS
+    (the current STATIC_PROMPT is, so it is sent inline).
+    """
+    display_name = f"mood-gen-{PROMPT_CACHE_KEY}"
+
+    # ~4 chars per token: a prefix far below the minimum needs no API call to rule out
+    if len(STATIC_PROMPT) // 4 < PROMPT_CACHE_MIN_TOKENS // 2:
+        return None
+    try:
+        tokens = genai.GenerativeModel(MODEL_NAME).count_tokens(STATIC_PROMPT).total_tokens
+    except Exception as e:
+        print(f"⚠️ Could not count prefix tokens ({e}). Sending prefix as system instruction.")
+        return None
+    if tokens < PROMPT_CACHE_MIN_TOKENS:
+        return None
+
+    if os.path.exists(PROMPT_CACHE_ID_FILE):
+        with open(PROMPT_CACHE_ID_FILE, 'r', encoding='utf-8') as f:
+            cache_name = f.read().strip()
+        try:
+            cached = caching.CachedContent.get(cache_name)
+            if cached.display_name == display_name:
+                return cached
+        except Exception:
+            pass  # Expired or deleted; create a fresh one below
+
+    try:
+        cached = caching.CachedContent.create(
+            model=f"models/{MODEL_NAME}",
+            display_name=display_name,
+            system_instruction=STATIC_PROMPT,
+            ttl=PROMPT_CACHE_TTL,
+        )
+    except Exception as e:
+        print(f"⚠️ Context cache unavailable ({e}). Sending prefix as system instruction.")
+        return None
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(PROMPT_CACHE_ID_FILE, 'w', encoding='utf-8') as f:
+        f.write(cached.name)
+    return cached
+
+
+def build_model(prompt_cache):
+    """Create a GenerativeModel bound to the cached prefix (or carrying it inline)."""
+    if prompt_cache is not None:
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=prompt_cache,
+            generation_config=GENERATION_CONFIG
+        )
+    return genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        system_instruction=STATIC_PROMPT,
+        generation_config=GENERATION_CONFIG
+    )
+
 # ==========================================
 # FILE HANDLING
 # ==========================================
+def json_loads(data):
+    """Parse JSON text/bytes (orjson when installed)."""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+def json_dumps(obj, indent=False):
+    """Serialize to a JSON string (orjson when installed), keeping non-ASCII as-is."""
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+_MODEL = None
+
+def get_model():
+    """The shared GenerativeModel, built once per process (also across main() calls)."""
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = build_model(get_prompt_cache())
+    return _MODEL
+
+def parse_emails(text):
+    """
+    Parse a {"emails": [...]} response. response_mime_type="application/json"
+    means the text is normally bare JSON; a fenced block is only unwrapped if
+    the model adds one anyway.
+    """
+    if text.startswith("```"):
+        text = text.strip().strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    return json_loads(text).get("emails", [])
+
 def load_data():
     if not os.path.exists(OUTPUT_FILE):
         return []
     try:
         with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return json_loads(f.read())
     except:
         return []
 
 def save_data(data):
+    """Write OUTPUT_FILE atomically: a crash mid-write leaves the previous file intact."""
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    tmp_path = OUTPUT_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json_dumps(data, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, OUTPUT_FILE)
+
+def staging_path(mood):
+    return os.path.join(STAGING_DIR, f"{mood.lower()}.jsonl")
+
+def save_incremental_jsonl(mood, rows):
+    """Append rows to the mood's staging file, one JSON object per line."""
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    with open(staging_path(mood), 'a', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json_dumps(row) + "\n")
+
+def count_staged(mood):
+    """
+    Number of emails already staged for a mood.
+
+    The first time a mood is seen its rows are seeded from OUTPUT_FILE,
+    so runs started before the JSONL staging existed resume correctly.
+    """
+    path = staging_path(mood)
+    if not os.path.exists(path):
+        save_incremental_jsonl(mood, [d for d in load_data() if d.get("mood") == mood])
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+def email_digest(text):
+    """Digest of an email, ignoring case and whitespace differences."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+def staged_digests(mood):
+    """Digests of every email already staged for a mood."""
+    path = staging_path(mood)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {email_digest(json_loads(line)["text"]) for line in f if line.strip()}
+
+def dedupe(rows, seen):
+    """Drop rows already in seen (or repeated within rows); seen is updated in place."""
+    unique = []
+    for row in rows:
+        h = email_digest(row["text"])
+        if h not in seen:
+            seen.add(h)
+            unique.append(row)
+    return unique
+
+def finalize_data():
+    """Rebuild the pretty OUTPUT_FILE from the staging files (one read, one write)."""
+    # Keep rows for moods this script doesn't generate
+    data = [d for d in load_data() if d.get("mood") not in MOODS]
+    for mood in MOODS:
+        path = staging_path(mood)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data.extend(json_loads(line) for line in f if line.strip())
+    save_data(data)
+    return len(data)
+
+# ==========================================
+# BATCH CACHE
+# ==========================================
+class LLMCache:
+    """
+    Disk-backed cache of generated batches, keyed by the full request payload.
+
+    Generation is sampled (temperature > 0), so each cached batch is treated as
+    one "sample": the n-th request for a given payload within a run maps to the
+    n-th stored batch. Batches whose rows reached the staging files are marked
+    consumed and skipped, so a re-run replays only results that were generated
+    but never saved (at zero API cost) before falling through to fresh calls.
+    """
+    def __init__(self, path=BATCH_CACHE_FILE, ttl=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches "
+            "(key TEXT PRIMARY KEY, payload TEXT, ts REAL, consumed INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Caches written before batches were marked consumed
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(batches)")}
+        if "consumed" not in columns:
+            self.conn.execute("ALTER TABLE batches ADD COLUMN consumed INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+        self._samples = {}  # payload key -> number of samples handed out this run
+
+    @staticmethod
+    def make_key(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def next_key(self, payload):
+        """Key for the next sample of this payload that hasn't been saved yet."""
+        base = self.make_key(payload)
+        sample = self._samples.get(base, 0)
+        while self.conn.execute(
+            "SELECT 1 FROM batches WHERE key = ? AND consumed = 1", (f"{base}:{sample}",)
+        ).fetchone():
+            sample += 1
+        self._samples[base] = sample + 1
+        return f"{base}:{sample}"
+
+    def get(self, key):
+        row = self.conn.execute("SELECT payload, ts FROM batches WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        payload, ts = row
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            return None
+        return json_loads(payload)["emails"]
+
+    def set(self, key, emails):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO batches (key, payload, ts, consumed) VALUES (?, ?, ?, 0)",
+            (key, json_dumps({"emails": emails, "ts": time.time()}), time.time())
+        )
+        self.conn.commit()
+
+    def consume(self, keys):
+        """Mark batches as saved to the staging files, so later runs don't replay them."""
+        self.conn.executemany("UPDATE batches SET consumed = 1 WHERE key = ?", [(k,) for k in keys])
+        self.conn.commit()
+
+# ==========================================
+# RATE LIMITING
+# ==========================================
+class RateLimiter:
+    """
+    Token bucket over requests/min and tokens/min.
+
+    Callers wait only as long as the buckets need to refill, instead of a
+    fixed sleep. The request rate adapts AIMD-style: it halves on a 429 and
+    climbs back by one RPM after each minute's worth of successes.
+    """
+
+    def __init__(self, rpm=RPM_ALLOWANCE, tpm=TPM_ALLOWANCE):
+        self.max_rpm = rpm
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.request_budget = 1.0  # Start with a single slot; no burst at start-up
+        self.token_budget = float(tpm)
+        self.updated = time.monotonic()
+        self.successes = 0
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.request_budget = min(self.rpm, self.request_budget + elapsed * self.rpm / 60)
+        self.token_budget = min(self.tpm, self.token_budget + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens_est):
+        """Wait until one request slot and tokens_est tokens are available, then take them."""
+        tokens_est = min(tokens_est, self.tpm)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.request_budget >= 1 and self.token_budget >= tokens_est:
+                    self.request_budget -= 1
+                    self.token_budget -= tokens_est
+                    return
+                wait = max(
+                    (1 - self.request_budget) * 60 / self.rpm,
+                    (tokens_est - self.token_budget) * 60 / self.tpm,
+                )
+                await asyncio.sleep(max(wait, 0.01))
+
+    def on_success(self):
+        """Additive increase: +1 RPM per minute's worth of successful calls."""
+        self.successes += 1
+        if self.rpm < self.max_rpm and self.successes >= self.rpm:
+            self.rpm = min(self.max_rpm, self.rpm + 1)
+            self.successes = 0
+
+    def on_rate_limited(self):
+        """Multiplicative decrease after a 429; also drain the request bucket."""
+        self.rpm = max(1.0, self.rpm / 2)
+        self.request_budget = min(self.request_budget, 0.0)
+        self.successes = 0
+        print(f"   🐢 Rate limited; throttling to {self.rpm:.0f} RPM")
+
 
 # ==========================================
 # GENERATION LOGIC
 # ==========================================
-async def generate_batch(model, mood, topic, style_name, style_desc):
-    prompt = build_prompt(mood, topic, style_name, style_desc, BATCH_SIZE)
+# Shared by every mood so total in-flight requests and request rate stay bounded
+STYLE_SEMAPHORE = asyncio.Semaphore(STYLE_CONCURRENCY)
+RATE_LIMITER = RateLimiter()
+
+
+class StagingBuffer:
+    """
+    Collects new rows per mood in memory and appends them to the staging
+    JSONL files in one go, once no new rows have arrived for `delay` seconds
+    (or at most every `max_wait` seconds while batches keep landing).
+    Cache keys of the batches behind those rows are marked consumed in
+    `cache` once the rows are on disk.
+    """
+
+    def __init__(self, delay=0.5, max_wait=5.0):
+        self.delay = delay
+        self.max_wait = max_wait
+        self.cache = None  # LLMCache, set by main() when caching is on
+        self.pending = {}
+        self.pending_keys = []
+        self.first_pending = None
+        self._task = None
+
+    def add(self, mood, rows, cache_keys=()):
+        """Buffer rows (and their batches' cache keys) and (re)arm the debounced flush."""
+        self.pending.setdefault(mood, []).extend(rows)
+        self.pending_keys.extend(cache_keys)
+        now = time.monotonic()
+        if self.first_pending is None:
+            self.first_pending = now
+        if self._task and not self._task.done():
+            if now - self.first_pending >= self.max_wait:
+                return  # Let the armed flush fire instead of postponing it again
+            self._task.cancel()
+        self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        self.flush()
+
+    def flush(self):
+        """Write everything buffered so far (runs on the event loop, so no interleaving)."""
+        pending, self.pending, self.first_pending = self.pending, {}, None
+        keys, self.pending_keys = self.pending_keys, []
+        for mood, rows in pending.items():
+            if rows:
+                save_incremental_jsonl(mood, rows)
+        if self.cache is not None and keys:
+            self.cache.consume(keys)
+
+    def close(self):
+        """Cancel any armed flush and write the remainder now."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self.flush()
+
+
+STAGING_BUFFER = StagingBuffer()
+
+# "retry_delay { seconds: 23 }" / "Please retry in 23.5s" in 429 messages
+RETRY_DELAY_RE = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)|retry in ([\d.]+)s', re.IGNORECASE)
+
+
+def retry_delay_seconds(error, attempt):
+    """
+    How long to wait after a 429: the server's suggested retry_delay when it
+    sends one, otherwise exponential backoff (1s, 2s, 4s, ... capped at 60s)
+    with +/-50% jitter so concurrent styles don't retry in lockstep.
+    """
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and getattr(delay, "seconds", None) is not None:
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+    match = RETRY_DELAY_RE.search(str(error))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+
+async def stream_emails(model, prompt):
+    """
+    Stream a generation and parse "emails" items incrementally with ijson.
+
+    Chunks are pushed into the parser as they arrive, so the full response
+    text is never assembled. response_mime_type="application/json" gives
+    bare JSON, so no fence stripping is needed.
+    """
+    emails = ijson.sendable_list()
+    parser = ijson.items_coro(emails, "emails.item")
+    parsed = []
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        parser.send(chunk.text.encode("utf-8"))
+        parsed.extend(emails)
+        del emails[:]
+    parser.close()
+    parsed.extend(emails)
+    return parsed
+
+async def generate_batch(model, mood, topic, style_name, cache=None):
+    """Labeled rows for one batch, plus its cache key (None without a cache)."""
+    prompt = get_prompt(mood, topic, style_name)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.next_key({
+            "model": MODEL_NAME,
+            "temperature": GENERATION_CONFIG["temperature"],
+            "mood": mood,
+            "topic": topic,
+            "style_name": style_name,
+            "batch_size": BATCH_SIZE,
+            "prompt_version": PROMPT_CACHE_KEY,
+        })
+        emails = cache.get(cache_key)
+        if emails is not None:
+            return [{"text": e, "mood": mood} for e in emails], cache_key
     
+    tokens_est = len(prompt) // 4 + BATCH_SIZE * EST_TOKENS_PER_EMAIL
     for attempt in range(3):
         try:
-            response = await model.generate_content_async(prompt)
-            clean_text = response.text.replace("```json", "").replace("```", "").strip()
-            if not clean_text: continue
-            
-            data = json.loads(clean_text)
-            emails = data.get("emails", [])
+            await RATE_LIMITER.acquire(tokens_est)
+            if HAS_IJSON:
+                async with STYLE_SEMAPHORE:
+                    emails = await stream_emails(model, prompt)
+                if not emails: continue  # Empty stream: retry, like an empty text response
+            else:
+                async with STYLE_SEMAPHORE:
+                    response = await model.generate_content_async(prompt)
+                text = response.text
+                if not text.strip(): continue
+                
+                emails = parse_emails(text)
+            RATE_LIMITER.on_success()
+            if cache is not None and emails:
+                cache.set(cache_key, emails)
             
             # Format as labeled data
-            return [{"text": e, "mood": mood} for e in emails]
+            return [{"text": e, "mood": mood} for e in emails], cache_key if emails else None
             
+        except api_exceptions.ResourceExhausted as e:
+            RATE_LIMITER.on_rate_limited()
+            delay = retry_delay_seconds(e, attempt)
+            print(f"   ⚠️ Retry {attempt+1} for {mood}/{style_name} in {delay:.1f}s: rate limited")
+            await asyncio.sleep(delay)
         except Exception as e:
+            # The limiter paces the retry; no fixed sleep needed
             print(f"   ⚠️ Retry {attempt+1} for {mood}/{style_name}: {e}")
-            await asyncio.sleep(2)
             
-    return []
+    return [], None
 
-async def process_mood(mood, semaphore):
+async def process_mood(mood, semaphore, model, cache=None):
     async with semaphore:
         print(f"[{mood}] Starting generation...")
         
-        # Configure Model
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(
-            model_name=MODEL_NAME,
-            generation_config={"response_mime_type": "application/json", "temperature": 0.9}
-        )
-        
         # Check Progress
-        all_data = load_data()
-        current_mood_data = [d for d in all_data if d["mood"] == mood]
-        count = len(current_mood_data)
+        count = count_staged(mood)
         
         if count >= TARGET_PER_MOOD:
             print(f"[{mood}] ✅ Already has {count} emails. Skipping.")
             return
 
+        # Digests of staged emails, so repeats from the model are dropped before writing
+        seen = staged_digests(mood)
+        generated = dropped = 0
+
         while count < TARGET_PER_MOOD:
-            # Randomly select Topic and Style for this batch to ensure variety
-            topic = random.choice(TOPICS)
-            style_name, style_desc = random.choice(list(STYLES.items()))
+            # One batch per style per round (only as many as still needed),
+            # each with a random Topic, generated concurrently.
+            needed = -(-(TARGET_PER_MOOD - count) // BATCH_SIZE)
+            styles = random.sample(list(STYLES), min(len(STYLES), needed))
+            topics = [random.choice(TOPICS) for _ in styles]
             
-            batch = await generate_batch(model, mood, topic, style_name, style_desc)
+            results = await asyncio.gather(
+                *[generate_batch(model, mood, t, s, cache) for t, s in zip(topics, styles)],
+                return_exceptions=True
+            )
             
-            if batch:
-                # Load, Append, Save (Inefficient but safe for resume)
-                current_all_data = load_data()
-                current_all_data.extend(batch)
-                save_data(current_all_data)
-                
-                count += len(batch)
-                print(f"   -> [{mood}] +{len(batch)} ({style_name} / {topic}) | Total: {count}")
+            new_rows = []
+            cache_keys = []
+            for style_name, topic, result in zip(styles, topics, results):
+                if isinstance(result, Exception):
+                    print(f"   ⚠️ [{mood}] {style_name} / {topic} failed: {result}")
+                    continue
+                batch, cache_key = result
+                if cache_key is not None:
+                    cache_keys.append(cache_key)
+                if batch:
+                    new_rows.extend(batch)
+                    print(f"   -> [{mood}] +{len(batch)} ({style_name} / {topic})")
             
-            await asyncio.sleep(1) # Rate limit safety
+            raw_count = len(new_rows)
+            new_rows = dedupe(new_rows, seen)
+            generated += raw_count
+            dropped += raw_count - len(new_rows)
+            if raw_count > len(new_rows):
+                print(f"   -> [{mood}] Dropped {raw_count - len(new_rows)}/{raw_count} duplicates")
+            # Batches are consumed even if every row was a duplicate: replaying them can't help
+            if new_rows or cache_keys:
+                # Append-only and debounced: rows hit the JSONL in coalesced writes
+                STAGING_BUFFER.add(mood, new_rows, cache_keys)
+            if new_rows:
+                count += len(new_rows)
+                print(f"   -> [{mood}] Total: {count}")
+
+        rate = (dropped / generated * 100) if generated else 0.0
+        print(f"[{mood}] 🎉 Completed {count} emails. (Dedupe: {dropped}/{generated} dropped, {rate:.1f}%)")
+
+# ==========================================
+# BATCH API (OFFLINE)
+# ==========================================
+def build_batch_requests(counts):
+    """
+    Write one Batch API request per missing batch to BATCH_REQUESTS_FILE.
+
+    Each row's key is "mood|style|topic|i" so results can be routed back
+    to their mood without relying on output order.
 
-        print(f"[{mood}] 🎉 Completed {count} emails.")
+    Returns:
+        int: Number of requests written
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    total = 0
+    with open(BATCH_REQUESTS_FILE, 'w', encoding='utf-8') as f:
+        for mood in MOODS:
+            needed = -(-max(0, TARGET_PER_MOOD - counts.get(mood, 0)) // BATCH_SIZE)
+            for i in range(needed):
+                topic = random.choice(TOPICS)
+                style_name = random.choice(list(STYLES))
+                row = {
+                    "key": f"{mood}|{style_name}|{topic}|{i}",
+                    "request": {
+                        "system_instruction": {"parts": [{"text": STATIC_PROMPT}]},
+                        "contents": [{"role": "user", "parts": [{"text": get_prompt(mood, topic, style_name)}]}],
+                        "generation_config": GENERATION_CONFIG,
+                    }
+                }
+                f.write(json_dumps(row) + "\n")
+                total += 1
+    return total
+
+
+def run_batch_job():
+    """Submit all remaining batches as one Batch API job, wait for it, and save the results."""
+    counts = {mood: count_staged(mood) for mood in MOODS}
+
+    total = build_batch_requests(counts)
+    if not total:
+        print("✅ Every mood already has its target. Nothing to submit.")
+        return
+
+    client = google_genai.Client(api_key=GOOGLE_API_KEY)
+    uploaded = client.files.upload(
+        file=BATCH_REQUESTS_FILE,
+        config={"display_name": "mood-gen-requests", "mime_type": "jsonl"}
+    )
+    job = client.batches.create(model=MODEL_NAME, src=uploaded.name, config={"display_name": "mood-gen"})
+    print(f"📤 Submitted batch job {job.name} ({total} requests).")
+
+    while job.state.name not in BATCH_DONE_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        job = client.batches.get(name=job.name)
+        print(f"   ⏳ {job.state.name}")
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        print(f"❌ Batch job ended in {job.state.name}: {job.error}")
+        return
 
-async def main():
+    results = client.files.download(file=job.dest.file_name).decode("utf-8")
+    seen = {mood: staged_digests(mood) for mood in MOODS}
+    saved = generated = 0
+    for line in results.splitlines():
+        if not line.strip():
+            continue
+        row = json_loads(line)
+        mood = row["key"].split("|", 1)[0]
+        try:
+            text = row["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            emails = parse_emails(text)
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"   ⚠️ Skipping {row['key']}: {e}")
+            continue
+        rows = dedupe([{"text": e, "mood": mood} for e in emails], seen.setdefault(mood, set()))
+        save_incremental_jsonl(mood, rows)
+        saved += len(rows)
+        generated += len(emails)
+
+    finalize_data()
+    print(f"✅ Saved {saved} emails from the batch job ({generated - saved} duplicates dropped).")
+
+
+async def main(use_cache=True, cache_ttl=None, use_batch_api=False):
     if not GOOGLE_API_KEY:
         print("❌ ERROR: GEMINI_API_KEY not found in .env")
         return
@@ -183,11 +772,34 @@ async def main():
     print(f"🎯 Target: {TARGET_PER_MOOD} emails per mood.")
     print(f"📂 Output: {OUTPUT_FILE}")
 
-    # Semaphore: 2 concurrent tasks to speed up but respect limits
-    semaphore = asyncio.Semaphore(2)
-    tasks = [process_mood(m, semaphore) for m in MOODS]
-    await asyncio.gather(*tasks)
-    print("\n✅ All Data Generation Complete!")
+    if use_batch_api:
+        if HAS_BATCH_API:
+            run_batch_job()
+            return
+        print("⚠️ 'google-genai' not installed; falling back to live generation.")
+
+    # One model (static prefix comes from the context cache) shared by every mood
+    model = get_model()
+    cache = LLMCache(ttl=cache_ttl) if use_cache else None
+    STAGING_BUFFER.cache = cache
+
+    # Every mood runs at once; STYLE_SEMAPHORE and RATE_LIMITER bound the actual API load
+    semaphore = asyncio.Semaphore(len(MOODS))
+    tasks = [process_mood(m, semaphore, model, cache) for m in MOODS]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Anything still buffered must reach disk, even on Ctrl+C / errors
+        STAGING_BUFFER.close()
+    total = finalize_data()
+    print(f"\n✅ All Data Generation Complete! ({total} emails in {OUTPUT_FILE})")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic mood training data with Gemini.")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API; ignore cached batches.")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="Ignore cached batches older than this many seconds.")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Submit all remaining batches as one offline Batch API job.")
+    args = parser.parse_args()
+    asyncio.run(main(use_cache=not args.no_cache, cache_ttl=args.cache_ttl, use_batch_api=args.batch_api))
\ No newline at end of file
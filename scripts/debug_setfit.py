@@ -1,11 +1,42 @@
 import os
+import argparse
+from functools import lru_cache
 from setfit import SetFitModel
 import numpy as np
 
 MODEL_PATH = "/home/muhammad-usman/FYP/ML/models/v2_setfit"
 
-print(f"⏳ Loading model from {MODEL_PATH}...")
-model = SetFitModel.from_pretrained(MODEL_PATH)
+def apply_precision(model, precision):
+    """
+    Lower the precision of the sentence-transformer body; the head stays FP32.
+
+    int8: dynamic quantization of every nn.Linear (CPU).
+    fp16: half-precision body (CUDA only; stays FP32 on CPU).
+    """
+    import torch
+    if precision == "int8":
+        model.model_body = torch.quantization.quantize_dynamic(
+            model.model_body, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif precision == "fp16":
+        if torch.cuda.is_available():
+            model.model_body = model.model_body.to("cuda").half()
+        else:
+            print("⚠️ FP16 needs a CUDA device; keeping FP32.")
+    return model
+
+@lru_cache(maxsize=None)
+def load_model(path=MODEL_PATH, precision="fp32"):
+    """Load the SetFit model once per process (re-runs in a REPL reuse it)."""
+    print(f"⏳ Loading model from {path} ({precision})...")
+    return apply_precision(SetFitModel.from_pretrained(path), precision)
+
+parser = argparse.ArgumentParser(description="Inspect SetFit mood predictions.")
+parser.add_argument("--precision", choices=["fp32", "fp16", "int8"], default="fp32",
+                    help="Inference precision for the encoder body.")
+args = parser.parse_args()
+
+model = load_model(precision=args.precision)
 
 print("\n📋 Model Labels:")
 if hasattr(model, "labels"):
@@ -23,12 +54,13 @@ test_texts = [
 ]
 
 print("\n🔮 Predictions:")
-for text in test_texts:
-    # Predict Label directly
-    pred_label = model.predict([text])[0]
-    
-    # Predict Proba
-    probs = model.predict_proba([text])[0]
+# One batched call each for .predict() and .predict_proba() (was two calls per text)
+all_probs = model.predict_proba(test_texts, batch_size=len(test_texts))
+if hasattr(all_probs, "cpu"):
+    all_probs = all_probs.cpu().numpy()
+all_preds = model.predict(test_texts, batch_size=len(test_texts))
+
+for text, pred_label, probs in zip(test_texts, all_preds, all_probs):
     max_idx = np.argmax(probs)
     
     print(f"Text: '{text}'")
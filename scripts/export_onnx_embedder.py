@@ -0,0 +1,62 @@
+"""
+One-time export of all-MiniLM-L6-v2 to ONNX with dynamic int8 quantization.
+
+Writes models/onnx_minilm/ (model.onnx, model_int8.onnx, tokenizer files),
+which src/m11_embedder.load_embedder picks up automatically.
+
+Requires: pip install optimum[onnxruntime]
+
+Usage:
+    python scripts/export_onnx_embedder.py          # portable dynamic int8
+    python scripts/export_onnx_embedder.py --vnni   # tuned for AVX-512 VNNI CPUs
+"""
+
+import os
+import sys
+import argparse
+
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from transformers import AutoTokenizer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.m11_embedder import ONNX_MODEL_FILE
+
+MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, "models", "onnx_minilm")
+
+
+def main(vnni=False):
+    print(f"📦 Exporting {MODEL_ID} to ONNX...")
+    model = ORTModelForFeatureExtraction.from_pretrained(MODEL_ID, export=True)
+    model.save_pretrained(OUTPUT_DIR)
+    AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(OUTPUT_DIR)
+
+    if vnni:
+        # Dynamic int8 laid out for VPDPBUSD; only pays off on CPUs with AVX-512 VNNI
+        print("🔧 Quantizing weights to int8 (AVX-512 VNNI)...")
+        quantizer = ORTQuantizer.from_pretrained(OUTPUT_DIR, file_name="model.onnx")
+        quantizer.quantize(
+            save_dir=OUTPUT_DIR,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False),
+            file_suffix="int8"  # -> model_int8.onnx
+        )
+    else:
+        print("🔧 Quantizing weights to int8...")
+        quantize_dynamic(
+            os.path.join(OUTPUT_DIR, "model.onnx"),
+            os.path.join(OUTPUT_DIR, ONNX_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+    print(f"✅ Saved to {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export MiniLM to int8 ONNX for m11_embedder.")
+    parser.add_argument("--vnni", action="store_true",
+                        help="Quantize with optimum's AVX-512 VNNI config (serve on VNNI-capable CPUs only)")
+    args = parser.parse_args()
+    main(vnni=args.vnni)
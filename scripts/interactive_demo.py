@@ -1,21 +1,25 @@
 import os
 import sys
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.m09_flow_manager import FlowManager
+from _engine import get_manager
+from src.m10_main_engine import configure_logging
 
 def type_writer(text, delay=0.01):
-    """Simulate typing effect."""
-    for char in text:
-        sys.stdout.write(char)
+    """Simulate typing effect (one write + flush per word, not per character)."""
+    words = text.split(' ')
+    for i, word in enumerate(words):
+        sys.stdout.write(word if i == len(words) - 1 else word + ' ')
         sys.stdout.flush()
-        time.sleep(delay)
+        time.sleep(delay * (len(word) + 1))
     print()
 
-def main():
+def main(typewriter=False):
     print("\n" + "="*60)
     print("🤖 JUNO AUTOMATION ENGINE - INTERACTIVE DEMO")
     print("="*60)
@@ -23,12 +27,16 @@ def main():
     # Initialize System
     print("⏳ Initializing System... (This may take a moment)")
     try:
-        manager = FlowManager()
+        manager = get_manager()
         print("✅ System Ready!\n")
     except Exception as e:
         print(f"❌ Failed to initialize system: {e}")
         return
 
+    # One worker: requests run off the main thread but never concurrently (FlowManager isn't thread-safe).
+    # Models were already warmed up at load (IntentClassifier.warmup; FAQ shares its embedder).
+    executor = ThreadPoolExecutor(max_workers=1)
+
     # Use Default Identity for Demo
     user_email = "demo_user@example.com"
     
@@ -48,13 +56,21 @@ def main():
             if not user_input:
                 continue
 
-            # Process Input
-            print("\n🤖 JUNO is thinking...", end="\r")
-            
             # Capture start time for latency check
             start_time = time.time()
             
-            response = manager.process_email(user_email, user_input)
+            # Process Input in the worker; animate while waiting
+            future = executor.submit(manager.process_email, user_email, user_input)
+            print("\n🤖 JUNO is thinking...", end="\r")
+            frames = "|/-\\"
+            spins = 0
+            while True:
+                try:
+                    response = future.result(timeout=0.1)
+                    break
+                except FutureTimeout:
+                    print(f"🤖 JUNO is thinking... {frames[spins % len(frames)]}", end="\r")
+                    spins += 1
             
             elapsed = time.time() - start_time
             
@@ -64,7 +80,10 @@ def main():
             # Display Response
             print(f"🤖 JUNO ({elapsed:.2f}s):")
             print("-" * 20)
-            type_writer(response.strip())
+            if typewriter:
+                type_writer(response.strip())
+            else:
+                print(response.strip())
             print("-" * 20)
             
             # Optional: Display Debug Info (Ticket State)
@@ -79,4 +98,7 @@ def main():
             print(f"\n❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Chat with the JUNO engine.")
+    parser.add_argument("--typewriter", action="store_true", help="Animate replies with a typing effect.")
+    main(typewriter=parser.parse_args().typewriter)
@@ -7,6 +7,9 @@ the user to interact with the engine in a loop.
 import os
 import sys
 import time
+import asyncio
+import argparse
+from functools import lru_cache
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -17,7 +20,9 @@ try:
 except ImportError:
     HAS_GEMINI = False
 
-from src.m09_flow_manager import FlowManager
+from _engine import get_manager
+from src.m10_main_engine import configure_logging
+from _env import load_env
 
 # Scenarios Definition
 SCENARIOS = {
@@ -28,20 +33,69 @@ SCENARIOS = {
     "5": {"name": "Custom Input", "prompt": None}
 }
 
+@lru_cache(maxsize=1)
+def get_gemini_model(api_key):
+    """Configure Gemini and build the model once; reused for every scenario."""
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-2.5-flash')
+
 def generate_email(prompt, api_key):
     """Generate an email using Gemini."""
     if not HAS_GEMINI or not api_key:
         return "Error: Gemini API not available. Please enter text manually."
     
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = get_gemini_model(api_key)
         response = model.generate_content(prompt)
         return response.text.strip()
     except Exception as e:
         return f"Error generating email: {e}"
 
-def main():
+async def generate_email_async(prompt, api_key):
+    """Async variant of generate_email (lets several scenarios generate at once)."""
+    if not HAS_GEMINI or not api_key:
+        return "Error: Gemini API not available. Please enter text manually."
+    
+    try:
+        model = get_gemini_model(api_key)
+        response = await model.generate_content_async(prompt)
+        return response.text.strip()
+    except Exception as e:
+        return f"Error generating email: {e}"
+
+async def run_batch(manager, scenario_keys, api_key, depth=3):
+    """
+    Run scenarios non-interactively as a two-stage pipeline.
+    
+    Up to `depth` Gemini generations are in flight while JUNO processes the
+    emails that are already ready (in a worker thread, one at a time).
+    A bounded queue between the stages caps how far generation runs ahead.
+    """
+    queue = asyncio.Queue(maxsize=depth)
+    limit = asyncio.Semaphore(depth)
+    
+    async def generate(key):
+        async with limit:
+            return key, await generate_email_async(SCENARIOS[key]['prompt'], api_key)
+    
+    async def produce():
+        for next_done in asyncio.as_completed([generate(k) for k in scenario_keys]):
+            await queue.put(await next_done)
+        await queue.put(None)
+    
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+    while (item := await queue.get()) is not None:
+        key, email_text = item
+        user_id = f"test_user_{key}_{int(time.time())}@example.com"
+        print(f"\n🤖 Scenario: {SCENARIOS[key]['name']}")
+        print(f"📨 Generated Email:\n---\n{email_text}\n---")
+        response = await loop.run_in_executor(None, manager.process_email, user_id, email_text)
+        print(f"\n🤖 JUNO Reply:\n{response}")
+        print("------------------------------------------")
+    await producer
+
+def main(batch=None):
     print("==========================================")
     print("   JUNO ENGINE - INTERACTIVE TESTER       ")
     print("==========================================")
@@ -50,31 +104,34 @@ def main():
     # Initialize Engine
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     
-    # Load .env manually
+    # Load .env
     env_path = os.path.join(project_root, ".env")
     print(f"🔍 Looking for .env at: {env_path}")
     if os.path.exists(env_path):
         print("   ✅ Found .env file.")
-        with open(env_path, "r") as f:
-            for line in f:
-                if line.strip() and not line.startswith("#"):
-                    try:
-                        key, value = line.strip().split("=", 1)
-                        os.environ[key] = value
-                        if key == "GEMINI_API_KEY":
-                            print("   ✅ Loaded GEMINI_API_KEY")
-                    except ValueError:
-                        pass # Skip malformed lines
+        env = load_env(env_path)
+        os.environ.update(env)
+        if "GEMINI_API_KEY" in env:
+            print("   ✅ Loaded GEMINI_API_KEY")
     else:
         print("   ❌ .env file NOT found.")
 
-    manager = FlowManager(project_root)
+    manager = get_manager(project_root)
     api_key = os.getenv("GEMINI_API_KEY")
     
     if not api_key:
         print("⚠️  Warning: GEMINI_API_KEY not found in environment.")
         print("   Auto-generation of scenarios will be disabled.")
     
+    if batch:
+        keys = [k.strip() for k in batch.split(",") if SCENARIOS.get(k.strip(), {}).get("prompt")]
+        if not api_key or not HAS_GEMINI:
+            print("❌ Batch mode needs Gemini to generate the emails.")
+            return
+        asyncio.run(run_batch(manager, keys, api_key))
+        print("\nBatch run complete.")
+        return
+    
     while True:
         print("\nSelect a Scenario:")
         for key, val in SCENARIOS.items():
@@ -127,4 +184,8 @@ def main():
     print("\nExiting Tester. Goodbye!")
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Interactive tester for the JUNO engine.")
+    parser.add_argument("--batch", metavar="KEYS",
+                        help="Run generated scenarios non-interactively, e.g. --batch 1,2,3,4")
+    main(batch=parser.parse_args().batch)
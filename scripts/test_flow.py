@@ -4,10 +4,12 @@ import os
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.m09_flow_manager import FlowManager
+from _engine import get_manager
+from src.m10_main_engine import configure_logging
 
+configure_logging()
 print("--- TESTING FLOW MANAGER ---")
-manager = FlowManager()
+manager = get_manager()
 
 # Scenario 1: FAQ
 print("\n[Test 1] FAQ Check")
@@ -17,8 +19,7 @@ print(f"Response: {response[:50]}...")
 # Scenario 2: Order Status (Missing Info)
 print("\n[Test 2] Order Status (Start)")
 # Ensure no previous ticket exists (for test purity)
-if "bob@example.com" in manager.ticket_manager.tickets:
-    manager.ticket_manager.close_ticket("bob@example.com")
+manager.ticket_manager.close_ticket("bob@example.com")
     
 response = manager.process_email("bob@example.com", "Where is my order? I am worried.")
 print(f"Response: {response[:50]}...")
@@ -13,7 +13,7 @@ MODEL_DIR = os.path.join(PROJECT_ROOT, "models")
 def run_tests():
     print("⏳ Initializing IntentClassifier...")
     try:
-        classifier = IntentClassifier(MODEL_DIR)
+        classifier = IntentClassifier.get(MODEL_DIR)
     except Exception as e:
         print(f"❌ Failed to initialize classifier: {e}")
         return
@@ -29,7 +29,12 @@ def run_tests():
         ("I am happy to wait, no rush.", "Happy"),   # "happy" + "wait" -> Happy
         ("This is not urgent, take your time.", "Neutral"), # "not urgent" -> Neutral
         ("As per my last email, I am still waiting.", "Angry"), # Passive Aggressive
-        ("Wow, great job breaking my order.", "Angry") # Sarcastic
+        ("Wow, great job breaking my order.", "Angry"), # Sarcastic
+        # Fast-path keywords still go through the safety overrides
+        ("I really appreciate it but I'm not happy with the delay", "Angry"),
+        ("Thank you so much, but I am still waiting and it's late. Where is my order?", "Angry"),
+        ("Is this urgent? Just checking, no rush.", "Neutral"),
+        ("It's not really urgent, just wondering", "Neutral"), # Negator two words back
     ]
 
     print("\n🧪 Running Mood Tests...")
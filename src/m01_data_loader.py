@@ -5,6 +5,13 @@ Handles loading JSON configurations and databases.
 
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 
 class DataLoader:
@@ -22,12 +29,15 @@ class DataLoader:
             dict: Loaded JSON data, or empty dict if file not found or invalid
         """
         try:
+            if HAS_ORJSON:
+                with open(filepath, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(filepath, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
             print(f"❌ CRITICAL ERROR: Could not find {filepath}")
             return {}
-        except json.JSONDecodeError:
+        except json.JSONDecodeError:  # orjson.JSONDecodeError subclasses this
             print(f"❌ CRITICAL ERROR: Invalid JSON in {filepath}")
             return {}
     
@@ -48,9 +58,11 @@ class DataLoader:
         mock_db_path = os.path.join(config_dir, "mock_database.json")
         templates_path = os.path.join(config_dir, "response_templates.json")
         
-        intent_config = DataLoader.load_json(intent_config_path)
-        mock_db = DataLoader.load_json(mock_db_path)
-        templates = DataLoader.load_json(templates_path)
+        # Independent, I/O-bound reads: load them concurrently
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            intent_config, mock_db, templates = pool.map(
+                DataLoader.load_json, [intent_config_path, mock_db_path, templates_path]
+            )
         
         if not intent_config:
             print("⚠️ WARNING: Intent Config is empty. Check 'config/intent_config.json'")
@@ -5,27 +5,177 @@ Wraps the Machine Learning Model for intent prediction.
 
 import os
 import re
+import logging
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
 import joblib
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
-from sentence_transformers import SentenceTransformer
-from setfit import SetFitModel
-import torch
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+from src.m11_embedder import EMBEDDER_NAME, cached_encode, get_embedder, get_query_cache
+
+logger = logging.getLogger(__name__)
+
+# setfit / torch are imported inside _get_setfit so that importing this module stays cheap
+
+# Max distinct texts kept in each per-text inference cache
+INFERENCE_CACHE_SIZE = 4096
+
+# Below this cosine score the closest intent anchor is not trusted
+UNKNOWN_INTENT_THRESHOLD = 0.25
+
+# Set JUNO_SETFIT_INT8=1 to serve the SetFit body with int8 dynamic quantization on CPU
+# (Linear layers only; check mood accuracy on hard_mood_data.json before enabling)
+SETFIT_INT8_ENV = "JUNO_SETFIT_INT8"
+
+# Unambiguous mood keywords answered without running SetFit, scanned as one
+# alternation (_MOOD_FAST_RE, one named group per mood). A hit with a negator
+# in the _NEGATION_WINDOW words before it ("not urgent", "isn't really
+# ridiculous") is ignored; see _mood_fast_path.
+_NEGATORS = frozenset({"not", "no", "never", "hardly", "nothing", "without"})
+_NEGATION_WINDOW = 3
+_WORD_RE = re.compile(r"[a-z']+")
+_MOOD_FAST_WORDS = {
+    "Angry": r"furious|unacceptable|ridiculous|outraged|livid",
+    "Happy": r"thank you so much|thanks so much|really appreciate",
+    "Urgent": r"asap|urgent|urgently|emergency|immediately",
+}
+_MOOD_FAST_RE = re.compile(
+    r"\b(?:" + "|".join(f"(?P<{mood}>{words})" for mood, words in _MOOD_FAST_WORDS.items()) + r")\b",
+    re.IGNORECASE
+)
+
+
+# Keyword fallback lists; on overlap MOOD_PRIORITY decides
+MOOD_KEYWORDS = {
+    "Angry": [
+        "angry", "upset", "frustrated", "annoyed", "furious", "mad", "disappointed",
+        "worst", "terrible", "horrible", "awful", "garbage", "trash", "useless", "broken", "damaged", "defective",
+        "scam", "fraud", "rip off", "refund", "money back", "chargeback", "cheated",
+        "stupid", "idiot", "incompetent", "ridiculous", "pathetic", "damn", "hell", "sucks"
+    ],
+    "Happy": [
+        "thanks", "thank you", "thx", "appreciate", "grateful",
+        "love", "great", "awesome", "amazing", "excellent", "perfect", "wonderful", "fantastic",
+        "good job", "best", "satisfied", "happy", "fast shipping", "high quality"
+    ],
+    "Urgent": [
+        "asap", "urgent", "emergency", "immediately", "right now", "hurry", "rush",
+        "deadline", "late", "overdue", "where is my", "haven't received", "waiting"
+    ],
+    "Confused": [
+        "confused", "don't understand", "didn't understand", "unsure", "not sure", "clarify", "explain",
+        "weird", "strange", "odd", "doesn't make sense", "help me understand", "how do i", "what does this mean"
+    ]
+}
+
+# Keyword precedence when several moods match (lower wins), independent of dict order
+MOOD_PRIORITY = {"Angry": 0, "Urgent": 1, "Confused": 2, "Happy": 3, "Neutral": 4}
+
+# SetFit class order when the model doesn't store labels (LabelEncoder sorts alphabetically)
+DEFAULT_MOOD_LABELS = ["Angry", "Confused", "Happy", "Neutral", "Urgent"]
+
+# Phrases that overturn a SetFit label (model bias fixes in predict_mood)
+SAFETY_OVERRIDES = {
+    # False Happy (e.g. "I am not happy")
+    "Happy": ("Angry", ["not happy", "unhappy", "disappointed", "delay", "waiting", "where is", "late"]),
+    # False Urgent (e.g. "Just checking status")
+    "Urgent": ("Neutral", ["just checking", "curious", "wondering", "no rush", "take your time", "update?"]),
+}
+
+
+class _KeywordMatcher:
+    """
+    Finds the highest-priority keyword of several groups in one pass.
+    
+    Priority is the label's rank in `priority` (group order if omitted),
+    then word order. Uses a single Aho-Corasick automaton when pyahocorasick
+    is installed, so the text is scanned once whatever the number of groups.
+    """
+    
+    def __init__(self, groups, priority=None):
+        """
+        Args:
+            groups (dict): label -> list of lowercase keywords, in priority order
+            priority (dict): Optional label -> rank (lower wins)
+        """
+        if priority is not None:
+            groups = dict(sorted(groups.items(), key=lambda item: priority[item[0]]))
+        self.groups = groups
+        self.automaton = None
+        if HAS_AHOCORASICK:
+            self.automaton = ahocorasick.Automaton()
+            rank = 0
+            for label, words in groups.items():
+                for word in words:
+                    if word not in self.automaton:  # Keep the higher-priority owner
+                        self.automaton.add_word(word, (rank, label, word))
+                    rank += 1
+            self.automaton.make_automaton()
+    
+    def first(self, text_lower):
+        """(label, keyword) for the best hit in text_lower, or None."""
+        if self.automaton is not None:
+            hits = [value for _, value in self.automaton.iter(text_lower)]
+            return min(hits)[1:] if hits else None
+        for label, words in self.groups.items():
+            for word in words:
+                if word in text_lower:
+                    return label, word
+        return None
+
+
+_MOOD_MATCHER = _KeywordMatcher(MOOD_KEYWORDS, MOOD_PRIORITY)
+_OVERRIDE_MATCHERS = {mood: (target, _KeywordMatcher({target: words}))
+                      for mood, (target, words) in SAFETY_OVERRIDES.items()}
+
+
+@lru_cache(maxsize=None)
+def _get_setfit(path):
+    """Process-wide SetFit model per directory (loading one costs seconds of disk IO and torch setup)."""
+    from setfit import SetFitModel
+    model = SetFitModel.from_pretrained(path)
+    model.model_body.eval()  # Inference only: no dropout
+    if os.environ.get(SETFIT_INT8_ENV) == "1" and model.model_body.device.type == "cpu":
+        import torch
+        model.model_body = torch.quantization.quantize_dynamic(
+            model.model_body, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        print("✅ Mood Model quantized to int8 (dynamic).")
+    return model
 
 
 class IntentClassifier:
-    """Wraps the Machine Learning Model for prediction."""
+    """
+    Wraps the Machine Learning Model for prediction.
+    
+    Heavy weights (MiniLM, SetFit) are process-wide singletons and anchor
+    vectors are cached on disk, so constructing another instance is cheap.
+    """
     
-    def __init__(self, model_dir):
+    def __init__(self, model_dir, embedder=None):
         """
         Initialize the intent classifier by loading the trained model.
         
         Args:
             model_dir (str): Directory containing the model files
+            embedder (object, optional): Pre-loaded sentence embedder to share
         """
         print(f"⏳ Loading models from {model_dir}...")
         
+        # LRU caches keyed by input text (both models are deterministic at inference);
+        # MiniLM query embeddings live in the embedder's shared QueryEmbeddingCache
+        self._mood_proba_cache = OrderedDict()
+        # Final answers too, so repeated messages skip scoring and override checks
+        self._intent_cache = OrderedDict()
+        self._mood_cache = OrderedDict()
+        
         # Paths
         self.intent_model_path = os.path.join(model_dir, "intent_model", "mood_classifier.joblib") # Renamed folder
         self.label_encoder_path = os.path.join(model_dir, "intent_model", "mood_label_encoder.joblib")
@@ -46,7 +196,7 @@ class IntentClassifier:
             
             if os.path.exists(mood_model_path):
                 try:
-                    self.mood_classifier = SetFitModel.from_pretrained(mood_model_path)
+                    self.mood_classifier = _get_setfit(os.path.abspath(mood_model_path))
                     print("✅ Mood Model (SetFit) Loaded.")
                 except Exception as e:
                     print(f"⚠️ Failed to load SetFit model: {e}")
@@ -55,8 +205,16 @@ class IntentClassifier:
                 print("⚠️ Mood model not found at v2_setfit. Using fallback.")
                 self.mood_classifier = None
             
-            # Using the efficient MiniLM model (matches training)
-            self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+            # Resolved once instead of on every predict_mood call
+            self._mood_labels = getattr(self.mood_classifier, "labels", None) or DEFAULT_MOOD_LABELS
+            self._no_grad = nullcontext
+            if self.mood_classifier:
+                import torch  # Already loaded by setfit
+                self._no_grad = torch.inference_mode  # No autograd bookkeeping during predict_proba
+            
+            # Using the efficient MiniLM model (matches training); int8 ONNX when exported
+            self.embedder = embedder or get_embedder(model_dir)
+            self._query_cache = get_query_cache(self.embedder)  # Same vectors the FAQ engine encodes
             
             # --- ZERO-SHOT INTENT ANCHORS ---
             # Map intents to representative phrases
@@ -68,27 +226,106 @@ class IntentClassifier:
                 "general_faq_question": "What is your return policy? How much is shipping?"
             }
             
-            # Pre-compute embeddings for intents
-            print("🧠 Computing Intent Embeddings...")
-            self.intent_embeddings = {}
-            for intent, phrase in self.intent_map.items():
-                self.intent_embeddings[intent] = self.embedder.encode(phrase)
-            
-            # Initialize Mood Anchors for Zero-Shot Classification
-            self.mood_anchors = {
-                "Angry": self.embedder.encode(["I am very angry and upset with this service."])[0],
-                "Happy": self.embedder.encode(["I am so happy and satisfied, thank you!"])[0],
-                "Urgent": self.embedder.encode(["This is an emergency, I need help immediately."])[0],
-                "Confused": self.embedder.encode(["I am confused and don't understand how this works."])[0],
-                "Neutral": self.embedder.encode(["Just asking a normal question about my order."])[0]
+            # Mood Anchors for Zero-Shot Classification
+            mood_phrases = {
+                "Angry": "I am very angry and upset with this service.",
+                "Happy": "I am so happy and satisfied, thank you!",
+                "Urgent": "This is an emergency, I need help immediately.",
+                "Confused": "I am confused and don't understand how this works.",
+                "Neutral": "Just asking a normal question about my order."
             }
             
+            # Pre-compute all anchor embeddings in one encode call (cached on disk across runs)
+            print("🧠 Computing Intent Embeddings...")
+            phrases = list(self.intent_map.values()) + list(mood_phrases.values())
+            vectors = cached_encode(
+                lambda: np.asarray(self.embedder.encode(phrases, convert_to_numpy=True), dtype=np.float32),
+                model_dir, "intent_anchors", phrases + [EMBEDDER_NAME, type(self.embedder).__name__],
+                rows=len(phrases)
+            )
+            self.intent_embeddings = dict(zip(self.intent_map, vectors[:len(self.intent_map)]))
+            self.mood_anchors = dict(zip(mood_phrases, vectors[len(self.intent_map):]))
+            
+            # (intents x dim) unit-length rows: scoring a text is one matrix-vector product
+            self._intent_names = list(self.intent_embeddings)
+            self._intent_matrix = self._normalize(np.stack(list(self.intent_embeddings.values())))
+            
+            self.warmup()
             print(f"✅ AI Engine Ready.")
             
         except Exception as e:
             print(f"❌ AI Engine Failed: {e}")
             self.embedder = None
 
+    @classmethod
+    def get(cls, model_dir):
+        """
+        Shared classifier for model_dir, built on first use.
+        
+        Scripts and the flow manager that run in the same process reuse one
+        loaded instance instead of reloading the models each time. An
+        instance whose models failed to load is not kept, so the next call
+        tries again.
+        """
+        return _shared_classifier(cls, os.path.abspath(model_dir))
+
+    def warmup(self):
+        """Run one throwaway inference per model (bypassing the caches) to pay lazy-init costs now."""
+        self.embedder.encode(["warmup"])
+        if self.mood_classifier:
+            with self._no_grad():
+                self.mood_classifier.predict_proba(["warmup"])
+
+    @staticmethod
+    def _cache_get(cache, key):
+        """Return a cached value (marking it recently used), or None."""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache, key, value):
+        """Store a value, evicting the least recently used entry when full."""
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)  # Shared between callers; keep it immutable
+        cache[key] = value
+        if len(cache) > INFERENCE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def _normalize(vectors):
+        """Float32 copy of vectors scaled to unit L2 norm along the last axis."""
+        vectors = np.array(vectors, dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+        return vectors
+
+    @staticmethod
+    def _clean_text(text):
+        """Collapse whitespace runs and trim; tokenization is unaffected, so cache keys dedupe better."""
+        return " ".join(text.split())  # Same result as sub(r'\s+', ' ').strip(), ~5x faster
+
+    def _encode(self, text):
+        """Unit-norm MiniLM embedding of text, shared with the FAQ engine's lookups."""
+        return self._query_cache.encode([text])[0]
+
+    def _mood_proba(self, text):
+        """SetFit class probabilities for text, reusing results for repeated inputs."""
+        text = self._clean_text(text)
+        probs = self._cache_get(self._mood_proba_cache, text)
+        if probs is None:
+            probs = self._predict_proba([text])[0]
+            self._cache_put(self._mood_proba_cache, text, probs)
+        return probs
+
+    def _predict_proba(self, texts):
+        """Uncached SetFit probabilities as a (texts x moods) NumPy array."""
+        with self._no_grad():
+            probs = self.mood_classifier.predict_proba(texts)
+        if hasattr(probs, "detach"):  # torch.Tensor
+            probs = probs.detach().cpu().numpy()  # .cpu() is a no-op for CPU tensors
+        return np.array(probs)
+
     def predict(self, text):
         """
         Predict the intent of the given text using Zero-Shot Cosine Similarity.
@@ -96,28 +333,133 @@ class IntentClassifier:
         if not self.embedder:
             return "error", 0.0
         
-        # Encode input text
-        text_embedding = self.embedder.encode(text)
+        text = self._clean_text(text)
+        result = self._cache_get(self._intent_cache, text)
+        if result is not None:
+            return result
         
-        # Find best match
-        best_intent = "unknown"
-        best_score = -1.0
+        # Encode input text (cached per unique text)
+        text_embedding = self._encode(text)
         
-        for intent, anchor_embedding in self.intent_embeddings.items():
-            # Cosine Similarity
-            score = cosine_similarity([text_embedding], [anchor_embedding])[0][0]
-            
-            if score > best_score:
-                best_score = score
-                best_intent = intent
+        # Cosine similarity against every intent anchor at once
+        scores = self._intent_matrix @ text_embedding
+        best_idx = int(scores.argmax())
+        best_intent = self._intent_names[best_idx]
+        best_score = float(scores[best_idx])
                 
         # Threshold for "unknown"
-        if best_score < 0.25: # Low threshold for now
-            return "unknown", float(best_score)
+        if best_score < UNKNOWN_INTENT_THRESHOLD: # Low threshold for now
+            result = ("unknown", best_score)
+        else:
+            result = (best_intent, best_score)
+        self._cache_put(self._intent_cache, text, result)
+        return result
+
+    def predict_joint(self, text):
+        """
+        Intent and mood for one text in a single call.
+        
+        The two heads can't share a forward pass: intent is scored on the
+        stock MiniLM embedding, mood on SetFit's fine-tuned body. This
+        normalises the text once and serves both from the per-text caches.
+        
+        Args:
+            text (str): Input text
             
-        return best_intent, float(best_score)
+        Returns:
+            tuple: (intent, confidence, mood)
+        """
+        text = self._clean_text(text)
+        intent, confidence = self.predict(text)
+        return intent, confidence, self.predict_mood(text)
+
+    def predict_batch(self, texts):
+        """
+        Predict intents for many texts with a single MiniLM encode call.
+        
+        Embeddings and results are added to the per-text caches, so a later
+        predict() on any of these texts is a lookup.
+        
+        Args:
+            texts (list): Input texts
+            
+        Returns:
+            list: (intent, score) tuples in the same order as texts
+        """
+        if not self.embedder:
+            return [("error", 0.0) for _ in texts]
+        if not texts:
+            return []
+        
+        texts = [self._clean_text(t) for t in texts]
+        
+        # (texts x intents) similarity matrix in one GEMM; unseen texts are encoded together
+        intent_names = self._intent_names
+        scores = self._query_cache.encode(texts) @ self._intent_matrix.T
+        best = scores.argmax(axis=1)
+        
+        results = []
+        for row, idx in enumerate(best):
+            score = float(scores[row, idx])
+            if score < UNKNOWN_INTENT_THRESHOLD:
+                result = ("unknown", score)
+            else:
+                result = (intent_names[idx], score)
+            self._cache_put(self._intent_cache, texts[row], result)
+            results.append(result)
+        return results
+
+    def predict_mood_batch(self, texts, batch_size=32):
+        """
+        Predict moods for many texts, running SetFit on all of them together.
+        
+        Texts that need the model (no keyword fast-path hit, not cached) are
+        sorted by length so each micro-batch pads to similar lengths, scored
+        in `batch_size` chunks, and cached; the per-text decision logic is
+        then exactly predict_mood's.
+        
+        Args:
+            texts (list): Input texts
+            batch_size (int): Texts per predict_proba call
+            
+        Returns:
+            list: Detected mood per text, in order
+        """
+        if self.mood_classifier:
+            pending = dict.fromkeys(
+                self._clean_text(t) for t in texts if not self._mood_fast_path(t)
+            )
+            missing = sorted(
+                (t for t in pending if self._cache_get(self._mood_proba_cache, t) is None), key=len
+            )
+            try:
+                for start in range(0, len(missing), batch_size):
+                    chunk = missing[start:start + batch_size]
+                    for t, probs in zip(chunk, self._predict_proba(chunk)):
+                        self._cache_put(self._mood_proba_cache, t, probs)
+            except Exception as e:
+                print(f"⚠️ Mood Model Error: {e}")  # predict_mood retries per text
+        
+        return [self.predict_mood(t) for t in texts]
 
     def predict_mood(self, text):
+        """
+        Predict the mood of the text, reusing the answer for repeated texts.
+        
+        Args:
+            text (str): Input text
+            
+        Returns:
+            str: Detected mood (Neutral, Angry, Happy, Confused, Urgent)
+        """
+        key = self._clean_text(text)
+        mood = self._cache_get(self._mood_cache, key)
+        if mood is None:
+            mood = self._predict_mood(key)
+            self._cache_put(self._mood_cache, key, mood)
+        return mood
+
+    def _predict_mood(self, text):
         """
         Predict the mood of the text using a Hybrid Approach.
         
@@ -131,17 +473,18 @@ class IntentClassifier:
             str: Detected mood (Neutral, Angry, Happy, Confused, Urgent)
         """
 
+        # --- LAYER 0: KEYWORD FAST PATH ---
+        mood = self._mood_fast_path(text)
+        if mood:
+            return self._safety_override(mood, text)
+
         # --- LAYER 1: ML MODEL (SetFit) ---
         if self.mood_classifier:
             try:
-                # Predict probabilities
-                # SetFit predict_proba returns a tensor/array
-                probs = self.mood_classifier.predict_proba([text])[0]
+                # Predict probabilities (cached per unique text)
+                probs = self._mood_proba(text)
                 
                 # Get max probability and index
-                if isinstance(probs, torch.Tensor):
-                    probs = probs.cpu().detach().numpy()
-                
                 max_idx = np.argmax(probs)
                 confidence = float(probs[max_idx])
                 
@@ -158,38 +501,13 @@ class IntentClassifier:
                 # Alternative: Use .predict() to get the label, and trust it if confidence is high?
                 # But .predict() doesn't give confidence.
                 
-                # Let's try to get labels from the model config if possible.
-                # self.mood_classifier.labels is often available in newer versions.
-                labels = getattr(self.mood_classifier, "labels", None)
-                
-                if labels:
-                    mood = labels[max_idx]
-                else:
-                    # Fallback: We know our 5 classes. They are usually sorted alphabetically by LabelEncoder during training.
-                    # Angry, Confused, Happy, Neutral, Urgent
-                    known_labels = ["Angry", "Confused", "Happy", "Neutral", "Urgent"]
-                    mood = known_labels[max_idx]
+                # Labels come from the model config when stored (newer SetFit versions),
+                # else DEFAULT_MOOD_LABELS; resolved once in __init__.
+                mood = self._mood_labels[max_idx]
 
                 # Confidence Threshold (0.50 for SetFit)
                 if confidence >= 0.50:
-                    # --- SAFETY OVERRIDES (Fixing Model Bias) ---
-                    text_lower = text.lower()
-                    
-                    # 1. False Happy (e.g. "I am not happy")
-                    if mood == "Happy":
-                        negatives = ["not happy", "unhappy", "disappointed", "delay", "waiting", "where is", "late"]
-                        if any(n in text_lower for n in negatives):
-                            print(f"🛡️ Safety Override: Happy -> Angry (Found '{[n for n in negatives if n in text_lower][0]}')")
-                            return "Angry"
-
-                    # 2. False Urgent (e.g. "Just checking status")
-                    if mood == "Urgent":
-                        calm_words = ["just checking", "curious", "wondering", "no rush", "take your time", "update?"]
-                        if any(c in text_lower for c in calm_words):
-                             print(f"🛡️ Safety Override: Urgent -> Neutral (Found '{[c for c in calm_words if c in text_lower][0]}')")
-                             return "Neutral"
-
-                    return mood
+                    return self._safety_override(mood, text)
                     
             except Exception as e:
                 print(f"⚠️ Mood Model Error: {e}")
@@ -197,38 +515,52 @@ class IntentClassifier:
         # --- LAYER 2: KEYWORD MATCHING (Fallback) ---
         return self._keyword_fallback(text)
 
+    @staticmethod
+    def _safety_override(mood, text):
+        """Apply SAFETY_OVERRIDES to a fast-path or SetFit label (fixes model and keyword bias)."""
+        if mood in _OVERRIDE_MATCHERS:
+            target, matcher = _OVERRIDE_MATCHERS[mood]
+            hit = matcher.first(text.lower())
+            if hit:
+                logger.debug("🛡️ Safety Override: %s -> %s (Found '%s')", mood, target, hit[1])
+                return target
+        return mood
+
+    @staticmethod
+    def _mood_fast_path(text):
+        """Mood from _MOOD_FAST_RE if all its hits name one mood, else None (ask the model)."""
+        mood = None
+        for match in _MOOD_FAST_RE.finditer(text):
+            before = _WORD_RE.findall(text[:match.start()].lower().replace("’", "'"))[-_NEGATION_WINDOW:]
+            if any(word in _NEGATORS or word.endswith("n't") for word in before):
+                continue  # Negated mention
+            if mood is None:
+                mood = match.lastgroup
+            elif match.lastgroup != mood:
+                return None  # Mixed signals: leave it to the model
+        return mood
+
     def _keyword_fallback(self, text):
         """Fallback to keyword matching."""
         text_lower = text.lower()
-        keywords = {
-            "Angry": [
-                "angry", "upset", "frustrated", "annoyed", "furious", "mad", "disappointed",
-                "worst", "terrible", "horrible", "awful", "garbage", "trash", "useless", "broken", "damaged", "defective",
-                "scam", "fraud", "rip off", "refund", "money back", "chargeback", "cheated",
-                "stupid", "idiot", "incompetent", "ridiculous", "pathetic", "damn", "hell", "sucks"
-            ],
-            "Happy": [
-                "thanks", "thank you", "thx", "appreciate", "grateful",
-                "love", "great", "awesome", "amazing", "excellent", "perfect", "wonderful", "fantastic",
-                "good job", "best", "satisfied", "happy", "fast shipping", "high quality"
-            ],
-            "Urgent": [
-                "asap", "urgent", "emergency", "immediately", "right now", "hurry", "rush",
-                "deadline", "late", "overdue", "where is my", "haven't received", "waiting"
-            ],
-            "Confused": [
-                "confused", "don't understand", "didn't understand", "unsure", "not sure", "clarify", "explain",
-                "weird", "strange", "odd", "doesn't make sense", "help me understand", "how do i", "what does this mean"
-            ]
-        }
         
         # Special handling for negations
         if "not happy" in text_lower or "unhappy" in text_lower:
             return "Angry"
             
-        for mood, words in keywords.items():
-            if any(word in text_lower for word in words):
-                return mood
-                
-        return "Neutral"
+        hit = _MOOD_MATCHER.first(text_lower)
+        return hit[0] if hit else "Neutral"
+
+
+# (class, model_dir) -> classifier whose models loaded; see IntentClassifier.get
+_shared_classifiers = {}
+
+
+def _shared_classifier(cls, model_dir):
+    classifier = _shared_classifiers.get((cls, model_dir))
+    if classifier is None:
+        classifier = cls(model_dir)
+        if classifier.embedder is not None:  # A failed init is retried on the next get()
+            _shared_classifiers[(cls, model_dir)] = classifier
+    return classifier
 
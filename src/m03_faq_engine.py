@@ -4,28 +4,125 @@ Handles semantic search against the Knowledge Base for General FAQ queries.
 """
 
 import os
+import re
 import json
+import logging
+import threading
+from collections import OrderedDict
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import simsimd
+    HAS_SIMSIMD = True
+except ImportError:
+    HAS_SIMSIMD = False
+
+try:
+    import faiss
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+from src.m11_embedder import EMBEDDER_NAME, cached_encode, get_embedder, get_query_cache, load_sentence_transformer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+# Distinct normalised queries whose best match is remembered
+FAQ_CACHE_SIZE = 1024
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# RapidFuzz ratio (0-100) at which a query counts as a KB question with typos,
+# answered without embedding it; lexical scores are reported on the cosine 0-1 scale
+FUZZY_MATCH_CUTOFF = 95
+
+# KB size (question rows) from which the fused Numba kernel replaces the (queries x KB) matrix
+NUMBA_MIN_KB_ROWS = 10_000
+
+# KB size from which an approximate FAISS HNSW index is used instead (takes precedence)
+FAISS_MIN_KB_ROWS = 10_000
+HNSW_NEIGHBOURS = 32
+HNSW_EF_CONSTRUCTION = 40
+
+# Storage formats for the KB matrix, and the rows upcast per block when scoring fp16/int8
+PRECISIONS = ("fp32", "fp16", "int8")
+UPCAST_BLOCK_ROWS = 4096
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _kb_argmax(embeddings, queries):
+        """Best KB row and its dot-product score per query, without a score matrix."""
+        n_rows, dim = embeddings.shape
+        best_idx = np.empty(queries.shape[0], dtype=np.int64)
+        best_score = np.empty(queries.shape[0], dtype=np.float32)
+        scores = np.empty(n_rows, dtype=np.float32)
+        for j in range(queries.shape[0]):
+            for i in prange(n_rows):
+                s = np.float32(0.0)
+                for k in range(dim):
+                    s += embeddings[i, k] * queries[j, k]
+                scores[i] = s
+            best_idx[j] = np.argmax(scores)
+            best_score[j] = scores[best_idx[j]]
+        return best_idx, best_score
 
 class FAQEngine:
     """
     Handles semantic search for FAQ retrieval.
     """
-    def __init__(self, config_path, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, config_path, model_name=EMBEDDER_NAME, precision="fp32", model_dir=DEFAULT_MODEL_DIR,
+                 embedder=None, mmap=True):
         """
         Initialize the FAQ Engine.
         
         Args:
             config_path (str): Path to knowledge_base.json
             model_name (str): Sentence Transformer model name
+            precision (str): KB matrix storage: 'fp32', 'fp16' (half the memory)
+                or 'int8' with per-row scales (a quarter; see _quantize)
+            model_dir (str): Models directory (ONNX export, cached KB embeddings)
+            embedder (object, optional): Pre-loaded sentence embedder to share
+            mmap (bool): Memory-map the cached fp32 matrix read-only, so worker
+                processes on one host share its pages; False loads a private copy
         """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+        self.precision = precision
+        self.mmap = mmap
+        self._match_cache = OrderedDict()  # normalised query -> (best_idx, best_score)
+        self._cache_lock = threading.Lock()  # Lookups may come from several threads
         print(f"📚 Loading Knowledge Base from: {config_path}")
-        self.kb = self._load_kb(config_path)
+        self.kb, kb_bytes = self._load_kb(config_path)
         
         print(f"🧠 Loading FAQ Model: {model_name}")
-        self.embedder = SentenceTransformer(model_name)
+        if embedder is not None:
+            self.embedder = embedder
+        elif model_name == EMBEDDER_NAME:
+            self.embedder = get_embedder(model_dir)  # Shared; ONNX Runtime when exported
+        else:
+            self.embedder = load_sentence_transformer(model_name)  # Deferred heavy import; GPU if present
+        self._query_cache = get_query_cache(self.embedder)  # Shared with the intent classifier
         
         # Pre-compute embeddings for all questions
         self.questions = []
@@ -35,21 +132,144 @@ class FAQEngine:
             for q in entry["questions"]:
                 self.questions.append(q)
                 self.question_map.append(entry)
+        
+        # Normalised questions for the lexical fast path in _lookup (first row wins)
+        self._normalized_questions = [self._cache_key(q) for q in self.questions]
+        self._question_rows = {}
+        for row, key in enumerate(self._normalized_questions):
+            self._question_rows.setdefault(key, row)
                 
         if self.questions:
-            self.embeddings = self.embedder.encode(self.questions)
+            self.embeddings = self._question_embeddings(kb_bytes, model_name, model_dir)
+            # Reduced precisions replace the FP32 matrix; only the smaller copy is kept
+            if self.precision == "int8":
+                self.embeddings, self.scales = self._quantize(self.embeddings)
+            elif self.precision == "fp16":
+                self.embeddings = self.embeddings.astype(np.float16)
+            self.index = None
+            if HAS_FAISS and self.precision == "fp32" and len(self.questions) >= FAISS_MIN_KB_ROWS:
+                # Inner product on unit vectors == cosine, so scores stay comparable to thresholds
+                self.index = faiss.IndexHNSWFlat(self.embeddings.shape[1], HNSW_NEIGHBOURS, faiss.METRIC_INNER_PRODUCT)
+                self.index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+                self.index.add(self.embeddings)
+            self.use_numba = (HAS_NUMBA and self.index is None and self.precision == "fp32"
+                              and len(self.questions) >= NUMBA_MIN_KB_ROWS)
+            if self.use_numba:
+                _kb_argmax(self.embeddings, self.embeddings[:1])  # Compile (or load from cache) up front
         else:
             self.embeddings = None
             print("⚠️ Warning: Knowledge Base is empty.")
 
+    def _question_embeddings(self, kb_bytes, model_name, model_dir):
+        """
+        Unit-length float32 question embeddings, cached on disk between runs.
+        
+        The cache (models/faq_emb_<hash>.npy) is keyed by the KB bytes, the
+        model name and the embedder backend, so editing the KB or switching
+        ONNX/PyTorch re-encodes automatically. Only fp32 engines keep the
+        memory map; fp16/int8 convert it into private memory.
+        """
+        def encode():
+            # Unit-length float32 rows: cosine similarity becomes a plain dot product
+            return np.ascontiguousarray(
+                self.embedder.encode(self.questions, batch_size=256, show_progress_bar=False,
+                                     convert_to_numpy=True, normalize_embeddings=True),
+                dtype=np.float32
+            )
+        
+        return cached_encode(
+            encode, model_dir, "faq_emb", [kb_bytes, model_name, type(self.embedder).__name__],
+            rows=len(self.questions), mmap=self.mmap
+        )
+
+    @staticmethod
+    def _quantize(vectors):
+        """
+        Symmetric per-row int8 quantization: row ~= int8_row * scale.
+        
+        Cuts KB memory 4x, which matters once the KB no longer fits in cache.
+        NumPy has no int8 BLAS kernel, so for small KBs the FP32 GEMM is
+        still as fast or faster; this path exists for memory-bound KBs.
+        
+        Returns:
+            tuple: (int8 matrix, float32 per-row scales)
+        """
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _scores(self, query_vecs):
+        """(queries x KB) cosine scores for unit-length query vectors."""
+        if self.precision == "fp32":
+            return query_vecs @ self.embeddings.T  # One GEMM (GEMV for a single query)
+        if HAS_SIMSIMD:
+            # SIMD kernels on the stored fp16/int8 rows directly, no upcast copy.
+            # Cosine is scale-invariant, so int8 rows need no per-row rescaling.
+            queries = query_vecs.astype(np.float16) if self.precision == "fp16" else self._quantize(query_vecs)[0]
+            distances = np.asarray(simsimd.cdist(queries, self.embeddings, metric="cosine"), dtype=np.float32)
+            return 1.0 - distances.reshape(len(query_vecs), len(self.embeddings))
+        if self.precision == "fp16":
+            # NumPy has no fp16 GEMM: upcast cache-sized blocks and run the fp32 BLAS on each
+            return self._blocked_scores(query_vecs)
+        q_i8, q_scales = self._quantize(query_vecs)
+        # int8 x int8 products summed over MiniLM's 384 dims stay below 2**24, so the
+        # fp32 BLAS on upcast blocks is exact; then rescale to cosine
+        dots = self._blocked_scores(q_i8.astype(np.float32))
+        return dots * q_scales[:, None] * self.scales[None, :]
+
+    def _blocked_scores(self, queries):
+        """queries @ KB.T in fp32, upcasting UPCAST_BLOCK_ROWS stored rows at a time (never the whole KB)."""
+        return np.concatenate([
+            queries @ self.embeddings[start:start + UPCAST_BLOCK_ROWS].astype(np.float32).T
+            for start in range(0, len(self.embeddings), UPCAST_BLOCK_ROWS)
+        ], axis=1)
+
+    def _best(self, query_vecs):
+        """Index and score of the best KB row for each query vector."""
+        if self.index is not None:
+            scores, ids = self.index.search(np.ascontiguousarray(query_vecs), 1)
+            return ids[:, 0], scores[:, 0]
+        if self.use_numba:
+            return _kb_argmax(self.embeddings, np.ascontiguousarray(query_vecs))
+        scores = self._scores(query_vecs)
+        best_idx = scores.argmax(axis=1)
+        return best_idx, scores[np.arange(len(best_idx)), best_idx]
+
+    @staticmethod
+    def _cache_key(query):
+        """Lowercased, whitespace-collapsed query (MiniLM is uncased, so encoding it is equivalent)."""
+        return WHITESPACE_RE.sub(" ", query).strip().lower()
+
+    def _cache_get(self, key):
+        """Cached (best_idx, best_score) for a normalised query, or None."""
+        with self._cache_lock:
+            hit = self._match_cache.get(key)
+            if hit is not None:
+                self._match_cache.move_to_end(key)
+            return hit
+
+    def _cache_put(self, key, hit):
+        with self._cache_lock:
+            self._match_cache[key] = hit
+            if len(self._match_cache) > FAQ_CACHE_SIZE:
+                self._match_cache.popitem(last=False)
+
+    def _resolve(self, hit, threshold):
+        """Map a (best_idx, best_score) pair to its KB entry if it clears the threshold."""
+        idx, best_score = hit
+        logger.debug("🔍 FAQ Match Score: %.2f (Threshold: %s)", best_score, threshold)
+        return self.question_map[idx] if best_score >= threshold else None
+
     def _load_kb(self, path):
-        """Load JSON knowledge base."""
+        """Load JSON knowledge base, returning (kb, raw file bytes)."""
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(path, 'rb') as f:
+                raw = f.read()
+            return (orjson.loads(raw) if HAS_ORJSON else json.loads(raw)), raw
         except Exception as e:
             print(f"❌ Failed to load KB: {e}")
-            return {}
+            return {}, b""
 
     def get_best_match(self, query, threshold=0.4):
         """
@@ -62,22 +282,75 @@ class FAQEngine:
         Returns:
             dict or None: Best matching entry (with 'answer') or None
         """
-        if self.embeddings is None:
-            return None
-            
-        query_vec = self.embedder.encode([query])
-        scores = cosine_similarity(query_vec, self.embeddings)[0]
-        
-        best_idx = np.argmax(scores)
-        best_score = scores[best_idx]
+        return self.get_best_matches([query], threshold)[0]
+
+    def get_best_matches(self, queries, threshold=0.4):
+        """
+        Find the best matching FAQ answer for several queries at once.
         
-        print(f"   🔍 FAQ Match Score: {best_score:.2f} (Threshold: {threshold})")
+        Repeated queries (after lowercasing and collapsing whitespace) are
+        answered from an LRU cache; the rest are encoded in one call and
+        scored against the KB together.
         
-        if best_score >= threshold:
-            return self.question_map[best_idx]
+        Args:
+            queries (list): User questions
+            threshold (float or list): Minimum score, shared or per query
             
+        Returns:
+            list: Best matching entry (or None) for each query, in order
+        """
+        if self.embeddings is None or not queries:
+            return [None] * len(queries)
+        
+        thresholds = threshold if isinstance(threshold, (list, tuple)) else [threshold] * len(queries)
+        keys = [self._cache_key(q) for q in queries]
+        hits = self._lookup(keys)
+        return [self._resolve(hits[key], t) for key, t in zip(keys, thresholds)]
+
+    def prime(self, queries):
+        """Score queries into the match cache ahead of time (one encode call, no output)."""
+        if self.embeddings is not None and queries:
+            self._lookup([self._cache_key(q) for q in queries])
+
+    def _lexical_hit(self, key):
+        """
+        (row, score) when key is a KB question verbatim, or within a few typos
+        of one (RapidFuzz, C++); else None and the query is embedded.
+        """
+        row = self._question_rows.get(key)
+        if row is not None:
+            return row, 1.0
+        if HAS_RAPIDFUZZ:
+            match = fuzz_process.extractOne(
+                key, self._normalized_questions, scorer=fuzz.ratio,
+                processor=None, score_cutoff=FUZZY_MATCH_CUTOFF
+            )
+            if match is not None:
+                return match[2], match[1] / 100.0
         return None
 
+    def _lookup(self, keys):
+        """(best_idx, best_score) per normalised key; misses are encoded together and cached."""
+        hits = {key: self._cache_get(key) for key in keys}
+        missing = []
+        for key, hit in hits.items():
+            if hit is None:
+                hit = self._lexical_hit(key)
+                if hit is None:
+                    missing.append(key)
+                else:
+                    hits[key] = hit
+                    self._cache_put(key, hit)
+        
+        if missing:
+            query_vecs = self._query_cache.encode(missing)
+            best_idx, best_scores = self._best(query_vecs)
+            for key, idx, best_score in zip(missing, best_idx, best_scores):
+                hits[key] = (int(idx), float(best_score))
+                self._cache_put(key, hits[key])
+        return hits
+
+
 if __name__ == "__main__":
     # Test Logic
     base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,24 +7,123 @@ import uuid
 import time
 import json
 import os
+import atexit
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _dumps(obj):
+    """Compact JSON bytes for a ticket payload (orjson when available)."""
+    return orjson.dumps(obj) if HAS_ORJSON else json.dumps(obj).encode("utf-8")
+
+
+def _loads(payload):
+    """Parse a stored payload (bytes, or text rows from older versions)."""
+    return orjson.loads(payload) if HAS_ORJSON else json.loads(payload)
+
+
+# Ticket severity per customer mood
+SEVERITY_BY_MOOD = {"Angry": "High", "Urgent": "High", "Confused": "Medium"}
+
+UUID_POOL_SIZE = 1024
+_uuid_pool = deque()
+_uuid_lock = threading.Lock()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_uuid_pool.clear)  # Children must not reuse parent ids
+
+
+def _new_ticket_id():
+    """
+    Next random (version 4) UUID string from a pre-generated pool.
+
+    Refills UUID_POOL_SIZE ids from a single os.urandom() call, instead of
+    one urandom read and UUID construction per ticket.
+    """
+    try:
+        return _uuid_pool.popleft()
+    except IndexError:
+        with _uuid_lock:
+            if not _uuid_pool:
+                raw = os.urandom(16 * UUID_POOL_SIZE)
+                _uuid_pool.extend(
+                    str(uuid.UUID(bytes=raw[i:i + 16], version=4))
+                    for i in range(0, len(raw), 16)
+                )
+            return _uuid_pool.popleft()
+
+
+@contextmanager
+def _transaction(db):
+    """
+    Explicit BEGIN/COMMIT (ROLLBACK on error) on an autocommit connection,
+    so a multi-row write is atomic and synced once instead of per row.
+    """
+    db.execute("BEGIN")
+    try:
+        yield db
+        db.execute("COMMIT")
+    except BaseException:
+        # Also on a failed COMMIT (e.g. SQLITE_BUSY): never leave the transaction open
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+
+def _iso(ns):
+    """Format an epoch-nanosecond timestamp as a local ISO-8601 string."""
+    return datetime.fromtimestamp(ns / 1e9).isoformat()
+
+
+def _ns(value):
+    """Epoch nanoseconds from a stored timestamp (ISO string or int)."""
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp() * 1_000_000) * 1000
+    return int(value)
+
+
+@lru_cache(maxsize=4096)
+def display_name(user_id):
+    """Greeting name guessed from an email address ('jane.doe@x.com' -> 'Jane.Doe'), cached per sender."""
+    return user_id.split('@')[0].title()
+
 class Ticket:
     """
     Represents a single customer support interaction state.
+    
+    Timestamps are kept as time.time_ns() ints and only formatted as ISO
+    strings in to_dict(). Attributes are fixed by __slots__ (no per-instance
+    __dict__), so setting an unknown attribute raises AttributeError.
+    History entries are (timestamp, sender, text) tuples in memory and
+    {"timestamp", "sender", "text"} dicts when serialized.
     """
+    __slots__ = (
+        "ticket_id", "user_id", "user_name", "intent", "mood", "severity", "extracted_entities",
+        "missing_fields", "status", "created_at", "updated_at", "history"
+    )
+
     def __init__(self, user_id, intent, mood="Neutral", entities=None, missing_fields=None, severity="Low"):
-        self.ticket_id = str(uuid.uuid4())
+        self.ticket_id = _new_ticket_id()
         self.user_id = user_id
+        self.user_name = display_name(user_id)  # Greeting name guess; derived, not stored
         self.intent = intent
         self.mood = mood
         self.severity = severity
         self.extracted_entities = entities or {}
         self.missing_fields = missing_fields or []
         self.status = "OPEN" # OPEN, PENDING_CUSTOMER, RESOLVED
-        self.created_at = datetime.now().isoformat()
+        self.created_at = time.time_ns()
         self.updated_at = self.created_at
-        self.history = [] # List of message dicts
+        self.history = [] # List of (timestamp_ns, sender, text) tuples
 
     def update_entities(self, new_entities):
         """Update extracted entities and remove them from missing fields."""
@@ -45,15 +144,11 @@ class Ticket:
                 if field not in self.extracted_entities
             ]
             
-        self.updated_at = datetime.now().isoformat()
+        self.updated_at = time.time_ns()
 
     def add_message(self, sender, text):
         """Add a message to the ticket history."""
-        self.history.append({
-            "timestamp": datetime.now().isoformat(),
-            "sender": sender, # 'user' or 'bot'
-            "text": text
-        })
+        self.history.append((time.time_ns(), sender, text))  # sender: 'user' or 'bot'
 
     def is_complete(self):
         """Check if all required fields are present."""
@@ -70,9 +165,12 @@ class Ticket:
             "extracted_entities": self.extracted_entities,
             "missing_fields": self.missing_fields,
             "status": self.status,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "history": self.history
+            "created_at": _iso(self.created_at),
+            "updated_at": _iso(self.updated_at),
+            "history": [
+                {"timestamp": _iso(ts), "sender": sender, "text": text}
+                for ts, sender, text in self.history
+            ]
         }
 
     @classmethod
@@ -88,57 +186,118 @@ class Ticket:
         )
         ticket.ticket_id = data["ticket_id"]
         ticket.status = data["status"]
-        ticket.created_at = data["created_at"]
-        ticket.updated_at = data["updated_at"]
-        ticket.history = data.get("history", [])
+        ticket.created_at = _ns(data["created_at"])
+        ticket.updated_at = _ns(data["updated_at"])
+        ticket.history = [
+            (_ns(msg["timestamp"]), msg["sender"], msg["text"]) for msg in data.get("history", [])
+        ]
         return ticket
 
 
 class TicketManager:
     """
     Manages the storage and retrieval of Tickets.
-    Uses JSON file storage for persistence.
+    
+    Persists one row per user in SQLite (WAL mode), so a mutation writes only
+    the ticket that changed and tickets are read on demand rather than all at
+    startup. A legacy '.json' path is migrated into a sibling '.db' file on
+    first use; storage_file=None keeps tickets in memory only.
+    
+    Creates and updates only mark the ticket dirty; flush() writes every
+    dirty ticket in one transaction and runs at interpreter exit. Closing a
+    ticket deletes its row immediately.
     """
     def __init__(self, storage_file="jinja_emails/tickets.json"):
         self.storage_file = storage_file
-        self.tickets = self._load_tickets()
+        self.tickets = {} # Tickets loaded or created this session (write-through cache)
+        self._lock = threading.Lock() # One connection, shared by caller threads
+        self._dirty = set() # user_ids whose ticket changed since the last flush
+        self.db = self._connect()
+        if self.db is not None:
+            atexit.register(self.flush)
 
-    def _load_tickets(self):
-        """Load tickets from JSON file."""
-        if not os.path.exists(self.storage_file):
-            return {}
+    def _connect(self):
+        """Open the ticket database, creating (and migrating into) it if needed."""
+        if self.storage_file is None:
+            return None
+        
+        json_path, db_path = None, self.storage_file
+        if db_path.endswith(".json"):
+            json_path, db_path = db_path, db_path[:-len(".json")] + ".db"
+        fresh = not os.path.exists(db_path)
         
+        db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; fsync at checkpoints only
+        db.execute("CREATE TABLE IF NOT EXISTS tickets (user_id TEXT PRIMARY KEY, payload BLOB NOT NULL)")
+        if fresh and json_path and os.path.exists(json_path):
+            self._migrate_json(db, json_path)
+        return db
+
+    @staticmethod
+    def _migrate_json(db, json_path):
+        """Copy tickets from the old whole-file JSON store into the database."""
         try:
-            with open(self.storage_file, 'r') as f:
-                data = json.load(f)
-                # Convert dicts back to Ticket objects
-                return {
-                    user_id: Ticket.from_dict(ticket_data)
-                    for user_id, ticket_data in data.items()
-                }
+            with open(json_path, 'rb') as f:
+                data = _loads(f.read())
+            with _transaction(db):
+                db.executemany(
+                    "INSERT OR REPLACE INTO tickets (user_id, payload) VALUES (?, ?)",
+                    [(user_id, _dumps(ticket_data)) for user_id, ticket_data in data.items()]
+                )
+            print(f"📦 Migrated {len(data)} tickets from {json_path}")
         except Exception as e:
-            print(f"⚠️ Failed to load tickets: {e}")
-            return {}
+            print(f"⚠️ Failed to migrate tickets: {e}")
 
-    def _save_tickets(self):
-        """Save tickets to JSON file."""
+    def _save_ticket(self, ticket):
+        """Mark a ticket for the next flush()."""
+        if self.db is not None:
+            with self._lock:
+                self._dirty.add(ticket.user_id)
+
+    def flush(self):
+        """Write all dirty tickets in a single transaction."""
+        if self.db is None or not self._dirty:
+            return
         try:
-            data = {
-                user_id: ticket.to_dict()
-                for user_id, ticket in self.tickets.items()
-            }
-            with open(self.storage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self._lock:
+                # Take the batch; ids marked while writing go to the fresh set
+                dirty, self._dirty = self._dirty, set()
+                try:
+                    rows = [(user_id, _dumps(self.tickets[user_id].to_dict()))
+                            for user_id in dirty if user_id in self.tickets]
+                    with _transaction(self.db):  # One BEGIN/COMMIT for the batch
+                        self.db.executemany(
+                            "INSERT OR REPLACE INTO tickets (user_id, payload) VALUES (?, ?)", rows
+                        )
+                except Exception:
+                    self._dirty |= dirty  # Retried on the next flush
+                    raise
         except Exception as e:
             print(f"❌ Failed to save tickets: {e}")
 
+    def close(self):
+        """Flush pending writes and close the database."""
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+            atexit.unregister(self.flush)
+
+    def _delete_ticket(self, user_id):
+        """Remove a single ticket row."""
+        if self.db is None:
+            return
+        try:
+            with self._lock:
+                self._dirty.discard(user_id)
+                self.db.execute("DELETE FROM tickets WHERE user_id = ?", (user_id,))
+        except Exception as e:
+            print(f"❌ Failed to delete ticket: {e}")
+
     def calculate_severity(self, mood):
-        """Calculate ticket severity based on mood."""
-        if mood in ["Angry", "Urgent"]:
-            return "High"
-        elif mood == "Confused":
-            return "Medium"
-        return "Low"
+        """Calculate ticket severity based on mood (unlisted moods are Low)."""
+        return SEVERITY_BY_MOOD.get(mood, "Low")
 
     def create_ticket(self, user_id, intent, mood, entities, missing_fields, severity=None):
         """Create and store a new ticket."""
@@ -147,33 +306,64 @@ class TicketManager:
             
         ticket = Ticket(user_id, intent, mood, entities, missing_fields, severity)
         self.tickets[user_id] = ticket
-        self._save_tickets() # Persist immediately
+        self._save_ticket(ticket) # Written on the next flush()
         print(f"🎫 Ticket Created: {ticket.ticket_id} for User: {user_id}")
         return ticket
 
     def get_ticket(self, user_id):
         """Get the active ticket for a user."""
-        return self.tickets.get(user_id)
+        ticket = self.tickets.get(user_id)
+        if ticket is None and self.db is not None:
+            try:
+                with self._lock:
+                    row = self.db.execute(
+                        "SELECT payload FROM tickets WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+            except Exception as e:
+                print(f"⚠️ Failed to load ticket: {e}")
+                row = None
+            if row:
+                ticket = Ticket.from_dict(_loads(row[0]))
+                self.tickets[user_id] = ticket
+        return ticket
 
-    def update_ticket(self, ticket):
+    def mark_dirty(self, ticket):
+        """Queue a modified ticket for the next flush() (write-behind)."""
+        self.tickets[ticket.user_id] = ticket
+        self._save_ticket(ticket)
+
+    def update_ticket(self, ticket, sync=False):
         """
         Explicitly save updates to a ticket.
         Call this after modifying a ticket object.
+        
+        Args:
+            ticket (Ticket): The modified ticket
+            sync (bool): Write it to storage now instead of on the next flush()
         """
-        self.tickets[ticket.user_id] = ticket
-        self._save_tickets()
+        self.mark_dirty(ticket)
+        if sync:
+            self.flush()
 
     def close_ticket(self, user_id):
         """Remove a ticket (mark as resolved/closed)."""
-        if user_id in self.tickets:
+        if self.get_ticket(user_id):
             del self.tickets[user_id]
-            self._save_tickets()
+            self._delete_ticket(user_id)
             print(f"🎫 Ticket Closed for User: {user_id}")
 
+    def clear(self):
+        """Drop every ticket, in memory and in storage."""
+        self.tickets.clear()
+        if self.db is not None:
+            with self._lock:
+                self._dirty.clear()
+                self.db.execute("DELETE FROM tickets")
+
 if __name__ == "__main__":
     # Test Logic
     print("--- Testing Ticket Manager (Persistence) ---")
-    manager = TicketManager("test_tickets.json")
+    manager = TicketManager("test_tickets.db")
     
     # 1. Create
     print("\n1. Creating Ticket...")
@@ -190,12 +380,12 @@ if __name__ == "__main__":
     # 2. Update
     print("\n2. Updating Ticket...")
     t.update_entities({"order_id": "12345"})
-    manager.update_ticket(t) # Save changes
+    manager.update_ticket(t, sync=True) # Save changes now (otherwise on flush()/exit)
     print(f"   Updated Missing: {t.missing_fields}")
     
     # 3. Reload
     print("\n3. Reloading Manager (Simulating Restart)...")
-    new_manager = TicketManager("test_tickets.json")
+    new_manager = TicketManager("test_tickets.db")
     loaded_t = new_manager.get_ticket("john@example.com")
     
     if loaded_t:
@@ -204,6 +394,9 @@ if __name__ == "__main__":
     else:
         print("   ❌ Failed to load ticket.")
         
-    # Cleanup
-    if os.path.exists("test_tickets.json"):
-        os.remove("test_tickets.json")
+    # Cleanup (WAL mode keeps -wal/-shm side files while connections are open)
+    manager.close()
+    new_manager.close()
+    for path in ("test_tickets.db", "test_tickets.db-wal", "test_tickets.db-shm"):
+        if os.path.exists(path):
+            os.remove(path)
@@ -5,13 +5,83 @@ Extracts structured data (Order IDs, Emails, Products) from text.
 
 import re
 
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Compiled once at import; extraction runs on every incoming message
+# Whitespace-delimited token, edge punctuation allowed, body 4+ of [A-Z0-9-] with a digit
+_ORDER_TOKEN_RE = re.compile(
+    r'(?<!\S)[.,?!]*((?=[A-Z0-9-]*[0-9])[A-Z0-9-]{4,})[.,?!]*(?!\S)', re.IGNORECASE
+)
+_DIGIT_RE = re.compile(r'[0-9]')
+# Domain labels can't contain '.', so the dotted part never backtracks into itself;
+# ASCII-only classes (?a:) are cheaper to test than Unicode \w
+_EMAIL_PATTERN = r'(?a:\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b)'
+_EMAIL_RE = re.compile(_EMAIL_PATTERN)
+
+# Email + labeled order ID in one scan; an address is consumed whole, so a label
+# inside it ("sid12345@x.com") is never read as an order ID
+_COMBINED_RE = re.compile(
+    r'(?P<email>' + _EMAIL_PATTERN + r')'
+    r'|(?:#|Order\s*:?\s*|id\s*:?\s*|ref\s*:?\s*)(?P<order_id>[A-Z0-9-]{4,})',
+    re.IGNORECASE
+)
+
+def _build_product_matcher(products):
+    """
+    Build a matcher over every lower-cased product name and alias.
+
+    Each term maps to (db_index, official_name); when a term is shared the
+    earlier product wins, matching the order of the original linear scan.
+    Without pyahocorasick the matcher is the ordered (term, value) list.
+    """
+    terms = {}
+    for idx, product in enumerate(products):
+        for term in [product["product_name"], *product.get("aliases", [])]:
+            key = term.lower()
+            if key:
+                terms.setdefault(key, (idx, product["product_name"]))
+
+    if HAS_AHOCORASICK:
+        matcher = ahocorasick.Automaton()
+        for key, value in terms.items():
+            matcher.add_word(key, value)
+        matcher.make_automaton()
+    else:
+        matcher = sorted(terms.items(), key=lambda item: item[1][0])  # DB order
+    return matcher
+
 
 class EntityExtractor:
     """
     Extracts structured data (Order IDs, Emails, Products) from text.
     Uses Strict Regex + Knowledge Base lookup to avoid false positives.
+    
+    The static methods take the database per call (and build the product
+    matcher each time); an instance binds it once and keeps its matcher
+    (EntityExtractor(db).extract(text, fields)).
     """
     
+    def __init__(self, database=None):
+        """
+        Args:
+            database (dict, optional): Database with the products list
+        """
+        self.database = database
+        self.invalidate()  # Build the product matcher now, not on the first email
+
+    def invalidate(self):
+        """Rebuild the product matcher; call after changing the database's products."""
+        products = (self.database or {}).get("products")
+        self._product_matcher = _build_product_matcher(products) if products else None
+
+    def extract(self, text, required_entities):
+        """run_extraction against the bound database."""
+        return self.run_extraction(text, required_entities, self.database, self._product_matcher)
+    
     @staticmethod
     def extract_order_id(text):
         """
@@ -29,27 +99,43 @@ class EntityExtractor:
             str or None: Extracted order ID, or None if not found
         """
         # Step 1: Look for explicit labeled IDs (High Confidence)
-        # Matches: #12345, Order: 12345, Ref 12345
-        explicit_pattern = r'(?:#|Order\s*:?\s*|id\s*:?\s*|ref\s*:?\s*)([A-Z0-9-]{4,})'
-        match = re.search(explicit_pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1)
+        # Matches: #12345, Order: 12345, Ref 12345 (same scan as run_extraction)
+        found = EntityExtractor._scan_labeled(text, want_order=True, want_email=False)
+        return found.get("order_id") or EntityExtractor._find_order_token(text)
+
+    @staticmethod
+    def _scan_labeled(text, want_order, want_email):
+        """
+        First labeled order ID and/or email in text, from one _COMBINED_RE pass.
+        
+        Stops as soon as every wanted entity has been seen.
+        
+        Returns:
+            dict: 'order_id' / 'email' -> first match of each wanted kind
+        """
+        found = {}
+        wanted = want_order + want_email
+        for match in _COMBINED_RE.finditer(text):
+            group = match.lastgroup
+            if group not in found and (want_order if group == "order_id" else want_email):
+                found[group] = match.group(group)
+                if len(found) == wanted:
+                    break
+        return found
 
-        # Step 2: Look for standalone IDs (Medium Confidence)
+    @staticmethod
+    def _find_order_token(text):
+        """Step 2 of extract_order_id: first standalone ID-like token, or None."""
+        # Look for standalone IDs (Medium Confidence)
         # Matches: 12345, ORD-123, 99999
         # Constraint: Must contain a digit to avoid English words.
-        tokens = text.split()
-        for token in tokens:
-            # Clean punctuation from edges
-            clean_token = token.strip(".,?!")
-            
-            # Check conditions: Length >= 4 AND contains digit AND allows A-Z, 0-9, -
-            if len(clean_token) >= 4 and any(char.isdigit() for char in clean_token):
-                # Verify it doesn't contain weird symbols (like emails)
-                if re.match(r'^[A-Z0-9-]+$', clean_token, re.IGNORECASE):
-                    return clean_token
-                    
-        return None
+        if not _DIGIT_RE.search(text):  # Most messages have no digits at all
+            return None
+        
+        # One scan for: Length >= 4 AND contains digit AND only A-Z, 0-9, -
+        # (whole whitespace-separated token, so emails etc. don't match)
+        match = _ORDER_TOKEN_RE.search(text)
+        return match.group(1) if match else None
 
     @staticmethod
     def extract_email(text):
@@ -62,46 +148,49 @@ class EntityExtractor:
         Returns:
             str or None: Extracted email, or None if not found
         """
-        # Standard email regex
-        pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-        match = re.search(pattern, text)
+        if "@" not in text:  # Cheap reject before the regex
+            return None
+        match = _EMAIL_RE.search(text)
         return match.group(0) if match else None
 
     @staticmethod
-    def extract_product(text, database):
+    def extract_product(text, database, matcher=None):
         """
         Extract product name from text by scanning against database.
         
-        Scans text for product names defined in mock_database.json.
-        Uses word-boundary checks to prevent partial matches.
+        Scans text for product names and aliases defined in mock_database.json
+        (case-insensitive substring match; the earliest product listed wins).
         
         Args:
             text (str): Input text to search
             database (dict): Database containing products list
+            matcher (object, optional): Prebuilt matcher for these products
+                (EntityExtractor keeps one); built from database if omitted
             
         Returns:
             str or None: Extracted product name, or None if not found
         """
-        text_lower = " " + text.lower() + " "  # Pad with spaces for boundary check
-        
-        for product in database.get("products", []):
-            official_name = product["product_name"].lower()
-            
-            # Check official name
-            if f" {official_name} " in text_lower or official_name in text.lower():
-                return product["product_name"]
-            
-            # Check aliases (synonyms)
-            for alias in product.get("aliases", []):
-                alias_lower = alias.lower()
-                # Check if alias exists in text (simple substring check usually works best for products)
-                if alias_lower in text_lower:
-                    return product["product_name"]  # Normalize to official name
-                    
+        products = database.get("products", [])
+        if not products:
+            return None
+        text_lower = text.lower()
+        if matcher is None:
+            matcher = _build_product_matcher(products)
+
+        if HAS_AHOCORASICK:
+            # Single O(len(text)) pass; lowest DB index wins
+            hits = [value for _, value in matcher.iter(text_lower)]
+            return min(hits)[1] if hits else None
+
+        # Names and aliases lower-cased once per catalog, checked in DB order
+        # (simple substring check usually works best for products)
+        for term, (_, official_name) in matcher:
+            if term in text_lower:
+                return official_name  # Normalize to official name
         return None
 
     @staticmethod
-    def run_extraction(text, required_entities, database=None):
+    def run_extraction(text, required_entities, database=None, product_matcher=None):
         """
         Extract all required entities from text.
         
@@ -111,26 +200,37 @@ class EntityExtractor:
             text (str): Input text to extract from
             required_entities (list): List of entity types to extract
             database (dict, optional): Database for product extraction
+            product_matcher (object, optional): Prebuilt matcher for its products
             
         Returns:
             dict: Dictionary of extracted entities
         """
         extracted = {}
+        required = frozenset(required_entities)  # Accepts a list, set or frozenset
+        want_order = "order_id" in required
+        want_email = "email" in required
         
-        if "order_id" in required_entities:
-            val = EntityExtractor.extract_order_id(text)
-            if val:
-                extracted["order_id"] = val
+        if want_order or want_email:
+            # One pass for both regex entities
+            found = EntityExtractor._scan_labeled(text, want_order, want_email)
             
-        if "email" in required_entities:
-            val = EntityExtractor.extract_email(text)
-            if val:
-                extracted["email"] = val
+            if want_order:
+                val = found.get("order_id") or EntityExtractor._find_order_token(text)
+                if val:
+                    extracted["order_id"] = val
+            
+            if want_email:
+                val = found.get("email")
+                if val is None and "@" in text:
+                    # An order-ID match can overlap the start of an address ("id: ab12@x.com")
+                    val = EntityExtractor.extract_email(text)
+                if val:
+                    extracted["email"] = val
             
-        if "product_name" in required_entities:
+        if "product_name" in required:
             if database is None:
                 raise ValueError("Database required for product_name extraction")
-            val = EntityExtractor.extract_product(text, database)
+            val = EntityExtractor.extract_product(text, database, product_matcher)
             if val:
                 extracted["product_name"] = val
             
@@ -3,9 +3,16 @@ State management module for the JUNO Automation Engine.
 Checks requirements and executes actions (database lookups).
 """
 
+import re
+import logging
 
 from src.m05_entity_extractor import EntityExtractor
 
+logger = logging.getLogger(__name__)
+
+# Valid order ID: starts with '#' or 'ORD-', is all digits, or is 4+ chars containing a digit
+_VALID_ORDER_ID_RE = re.compile(r'#|ORD-|\d+\Z|(?=.{4}).*?\d', re.IGNORECASE | re.DOTALL)
+
 class StateManager:
     """
     Checks requirements and executes "Actions" (DB Lookups).
@@ -22,6 +29,37 @@ class StateManager:
         self.db = db
         self.intent_config = intent_config
 
+        self.invalidate()
+
+        # action_type -> handler(extracted_data); one dict lookup per request
+        self._dispatch = {
+            "lookup_order": lambda d: self._lookup_order(d["order_id"]),
+            "check_stock": lambda d: self._check_stock(d["product_name"]),
+            "get_product_info": lambda d: self._get_product_info(d["product_name"]),
+            "trigger_reset": lambda d: self._trigger_reset(d["email"]),
+            "general_reply": lambda d: {"state": "success", "data": {}},
+        }
+
+    def invalidate(self):
+        """
+        Rebuild the O(1) lookup indexes; call after changing self.db.
+        
+        FlowManager.invalidate() does this and also rebuilds the entity
+        extractor's product matcher, so both see the same products.
+        """
+        self._orders_by_id = self._index(self.db.get("orders", []), "order_id")
+        self._products_by_name = self._index(self.db.get("products", []), "product_name", str.lower)
+        self._users_by_email = self._index(self.db.get("users", []), "email")
+
+    @staticmethod
+    def _index(rows, key, normalize=None):
+        """Map rows by key, keeping the first row for duplicate keys (like a linear scan)."""
+        index = {}
+        for row in rows:
+            value = normalize(row[key]) if normalize else row[key]
+            index.setdefault(value, row)
+        return index
+
     def process_request(self, intent, extracted_data):
         """
         Process a request by checking requirements and executing actions.
@@ -48,22 +86,11 @@ class StateManager:
 
         # 3. Execute Action (Dispatch)
         action = config.get("action_type")
-        print(f"   [DEBUG-STATE] Intent: {intent}, Action: {action}, Extracted: {extracted_data}")
+        logger.debug("Intent: %s, Action: %s, Extracted: %s", intent, action, extracted_data)
         
-        if action == "lookup_order":
-            return self._lookup_order(extracted_data["order_id"])
-            
-        elif action == "check_stock":
-            return self._check_stock(extracted_data["product_name"])
-            
-        elif action == "get_product_info":
-            return self._get_product_info(extracted_data["product_name"])
-            
-        elif action == "trigger_reset":
-            return self._trigger_reset(extracted_data["email"])
-            
-        elif action == "general_reply":
-            return {"state": "success", "data": {}}
+        handler = self._dispatch.get(action)
+        if handler:
+            return handler(extracted_data)
 
         return {"state": "error", "data": {}}
 
@@ -72,13 +99,8 @@ class StateManager:
     def _validate_order_id(self, order_id):
         """Check if order ID format is valid."""
         # Allow: #12345, ORD-123, or just digits 12345
-        if not order_id: return False
-        if order_id.startswith("#") or order_id.upper().startswith("ORD-") or order_id.isdigit():
-            return True
         # Also allow alphanumeric if it looks like a hash (e.g. 5 chars+)
-        if len(order_id) >= 4 and any(c.isdigit() for c in order_id):
-            return True
-        return False
+        return bool(order_id) and _VALID_ORDER_ID_RE.match(order_id) is not None
 
     def _lookup_order(self, order_id):
         """Look up an order in the database."""
@@ -86,8 +108,7 @@ class StateManager:
         if not self._validate_order_id(order_id):
             return {"state": "invalid_format", "data": {}, "missing": ["Order ID"]}
 
-        orders = self.db.get("orders", [])
-        result = next((item for item in orders if item["order_id"] == order_id), None)
+        result = self._orders_by_id.get(order_id)
         
         if result:
             return {"state": "success", "data": result}
@@ -96,8 +117,7 @@ class StateManager:
 
     def _check_stock(self, product_name):
         """Check stock status for a product."""
-        products = self.db.get("products", [])
-        result = next((item for item in products if item["product_name"] == product_name), None)
+        result = self._products_by_name.get(product_name.lower())
         
         if result:
             return {"state": "success", "data": result}
@@ -110,8 +130,7 @@ class StateManager:
 
     def _trigger_reset(self, email):
         """Trigger password reset for a user."""
-        users = self.db.get("users", [])
-        result = next((item for item in users if item["email"] == email), None)
+        result = self._users_by_email.get(email)
         
         if result:
             return {"state": "success", "data": {"email": email}}
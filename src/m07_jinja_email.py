@@ -4,7 +4,40 @@ Wraps Jinja2 to handle dynamic email generation based on Mood and Data.
 """
 
 import os
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import threading
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Compiled template bytecode survives restarts here (git-ignored)
+BYTECODE_CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache", "jinja")
+
+# Max distinct (template, context) renders kept; templates are pure functions of context
+RENDER_CACHE_SIZE = 512
+
+
+def _has_ticket_id(context):
+    """True if the context (or a dict inside it) carries a ticket_id, unique per render."""
+    return "ticket_id" in context or any(
+        isinstance(v, dict) and "ticket_id" in v for v in context.values()
+    )
+
+
+def _freeze(value):
+    """
+    Hashable key for a render context value.
+    
+    Types are part of the key because 1, 1.0 and True compare equal but
+    render differently. Raises TypeError for values that can't be hashed.
+    """
+    if isinstance(value, dict):
+        return dict, frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(v) for v in value)
+    hash(value)
+    return type(value), value
+
 
 class TemplateEngine:
     """
@@ -19,20 +52,40 @@ class TemplateEngine:
         """
         # Resolve absolute path relative to project root if needed
         if not os.path.isabs(template_dir):
-            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            template_dir = os.path.join(base_path, template_dir)
+            template_dir = os.path.join(PROJECT_ROOT, template_dir)
             
         print(f"🎨 Loading Templates from: {template_dir}")
         
+        try:
+            os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+        except OSError as e:
+            # Read-only checkout/container: compile in memory on every start instead
+            print(f"⚠️ Template bytecode cache disabled: {e}")
+            bytecode_cache = None
         self.env = Environment(
             loader=FileSystemLoader(template_dir),
-            autoescape=select_autoescape(['html', 'xml'])
+            autoescape=select_autoescape(['html', 'xml']),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,  # Templates don't change while the engine runs: no stat per get_template
+            cache_size=-1  # Never evict compiled templates
         )
+        
+        self._render_cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # render() is called from worker threads
+        
+        # Compile every template now (or load its cached bytecode) instead of on first render
+        for name in self.env.list_templates(filter_func=lambda n: n.endswith(".j2")):
+            self.env.get_template(name)
 
     def render(self, template_name, context):
         """
         Render a specific template with the given context.
         
+        Results are cached per (template, context); contexts holding
+        unhashable values or a ticket_id (never repeated) are rendered
+        directly.
+        
         Args:
             template_name (str): Name of the template file (e.g., 'order_status.j2')
             context (dict): Dictionary of variables to inject (mood, data, etc.)
@@ -40,12 +93,32 @@ class TemplateEngine:
         Returns:
             str: Rendered text
         """
+        key = None
+        if not _has_ticket_id(context):
+            try:
+                key = (template_name, _freeze(context))
+            except TypeError:
+                pass
+        if key is not None:
+            with self._cache_lock:
+                text = self._render_cache.get(key)
+                if text is not None:
+                    self._render_cache.move_to_end(key)
+                    return text
+        
         try:
             template = self.env.get_template(template_name)
-            return template.render(**context)
+            text = template.render(**context)
         except Exception as e:
             print(f"❌ Template Rendering Error ({template_name}): {e}")
             return "System Error: Unable to generate response."
+        
+        if key is not None:
+            with self._cache_lock:
+                self._render_cache[key] = text
+                if len(self._render_cache) > RENDER_CACHE_SIZE:
+                    self._render_cache.popitem(last=False)
+        return text
 
 if __name__ == "__main__":
     # Test Logic
@@ -6,6 +6,9 @@ Acts as a final quality gate before sending.
 
 import os
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 try:
     import google.generativeai as genai
     from google.api_core import exceptions
@@ -14,10 +17,16 @@ except ImportError:
     HAS_GEMINI = False
     genai = None
 
+# Distinct (draft, mood) pairs whose vetted text is remembered
+VETTING_CACHE_SIZE = 1024
+
 class ComplianceEngine:
     """
     Vets email drafts using LLM (Gemini) to ensure they are safe, 
     professional, and empathetic.
+    
+    Templated drafts repeat a lot, so vetted results are cached per
+    (draft, mood) and identical drafts skip the API round trip.
     """
     def __init__(self, api_key=None):
         """
@@ -27,6 +36,8 @@ class ComplianceEngine:
             api_key (str): Google Gemini API Key. If None, looks for GEMINI_API_KEY env var.
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._vetted = OrderedDict()  # (draft digest, mood) -> vetted text, LRU order
+        self._cache_lock = threading.Lock()
         
         if not HAS_GEMINI:
             print("⚠️ Warning: 'google-generativeai' library not installed. Compliance Layer will run in PASSTHROUGH mode.")
@@ -60,9 +71,41 @@ class ComplianceEngine:
         if not self.model:
             return draft_text
 
+        key, vetted = self._cached(draft_text, mood)
+        if vetted is not None:
+            return vetted
+
+        try:
+            response = self.model.generate_content(self._build_prompt(draft_text, mood))
+            return self._accept(key, response, draft_text)
+        except Exception as e:
+            print(f"⚠️ Compliance Check Failed (Fail Open): {e}")
+            return draft_text
+
+    async def vet_response_async(self, draft_text, mood="Neutral"):
+        """
+        vet_response for asyncio callers: the Gemini round trip is awaited
+        (generate_content_async) instead of blocking a thread, so several
+        drafts can be vetted concurrently. Same cache and fail-open rules.
+        """
+        if not self.model:
+            return draft_text
+
+        key, vetted = self._cached(draft_text, mood)
+        if vetted is not None:
+            return vetted
+
         try:
-            # Construct Prompt
-            prompt = f"""
+            response = await self.model.generate_content_async(self._build_prompt(draft_text, mood))
+            return self._accept(key, response, draft_text)
+        except Exception as e:
+            print(f"⚠️ Compliance Check Failed (Fail Open): {e}")
+            return draft_text
+
+    @staticmethod
+    def _build_prompt(draft_text, mood):
+        """Compliance review prompt for one draft."""
+        return f"""
             Act as a Senior Customer Support Compliance Officer.
             Review the following email draft intended for a customer.
             
@@ -82,17 +125,26 @@ class ComplianceEngine:
             Output:
             Return ONLY the final improved version of the email. Do not add any conversational filler like "Here is the improved email". Just the email body.
             """
-            
-            response = self.model.generate_content(prompt)
-            
-            if response.text:
-                return response.text.strip()
-            else:
-                return draft_text
-                
-        except Exception as e:
-            print(f"⚠️ Compliance Check Failed (Fail Open): {e}")
+
+    def _cached(self, draft_text, mood):
+        """(cache key, vetted text or None) for a draft."""
+        key = (hashlib.blake2b(draft_text.encode("utf-8"), digest_size=16).digest(), mood)
+        with self._cache_lock:
+            vetted = self._vetted.get(key)
+            if vetted is not None:
+                self._vetted.move_to_end(key)
+        return key, vetted
+
+    def _accept(self, key, response, draft_text):
+        """Vetted text from a Gemini response (cached), or the draft if it came back empty."""
+        if not response.text:
             return draft_text
+        vetted = response.text.strip()
+        with self._cache_lock:  # Only real answers are cached, never fail-open fallbacks
+            self._vetted[key] = vetted
+            if len(self._vetted) > VETTING_CACHE_SIZE:
+                self._vetted.popitem(last=False)
+        return vetted
 
 if __name__ == "__main__":
     # Test Logic
@@ -5,6 +5,8 @@ Integrates FAQ, Intent Classification, Ticket Management, and Response Generatio
 """
 
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from src.m02_intent_classifier import IntentClassifier
 from src.m03_faq_engine import FAQEngine
 from src.m04_ticket_manager import TicketManager
@@ -13,6 +15,8 @@ from src.m06_email_state_manager import StateManager
 from src.m05_entity_extractor import EntityExtractor
 from src.m01_data_loader import DataLoader
 
+logger = logging.getLogger(__name__)
+
 class FlowManager:
     """
     Orchestrates the conversation flow:
@@ -24,27 +28,132 @@ class FlowManager:
     """
     def __init__(self, project_root="."):
         print("🚀 Initializing JUNO Flow Manager...")
-        
-        # 1. Load Configs
-        self.intent_config, self.mock_db, _ = DataLoader.load_configs(project_root)
-        print(f"   [DEBUG-FLOW] Intent Config Keys: {list(self.intent_config.keys())}")
-        
-        # 2. Initialize Components
         model_dir = os.path.join(project_root, "models")
         kb_path = os.path.join(project_root, "config", "knowledge_base.json")
         
-        self.classifier = IntentClassifier(model_dir)
-        self.faq_engine = FAQEngine(kb_path)
-        self.ticket_manager = TicketManager(os.path.join(project_root, "jinja_emails", "tickets.json"))
-        self.template_engine = TemplateEngine(os.path.join(project_root, "jinja_emails"))
+        # 1. Load configs, classifier and FAQ index in parallel: model and KB file
+        # reads overlap (torch/ONNX release the GIL while loading). Both components
+        # take the same shared embedder, which get_embedder loads only once.
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="juno-init") as pool:
+            configs = pool.submit(DataLoader.load_configs, project_root)
+            classifier = pool.submit(IntentClassifier.get, model_dir)
+            faq_engine = pool.submit(FAQEngine, kb_path, model_dir=model_dir)
+            
+            # Cheap, file-only components are built meanwhile
+            self.ticket_manager = TicketManager(os.path.join(project_root, "jinja_emails", "tickets.json"))
+            self.template_engine = TemplateEngine(os.path.join(project_root, "jinja_emails"))
+            
+            self.intent_config, self.mock_db, _ = configs.result()
+            self.classifier = classifier.result()
+            self.faq_engine = faq_engine.result()
+        logger.debug("Intent Config Keys: %s", list(self.intent_config))
+        
+        # Response template per resolved intent, from each intent's optional "template" key
+        self._intent_to_template = {
+            intent: cfg["template"] for intent, cfg in self.intent_config.items() if "template" in cfg
+        }
+        
+        # 2. Components that need the configs
         self.state_manager = StateManager(self.mock_db, self.intent_config)
+        self.entity_extractor = EntityExtractor(self.mock_db)  # Product lookup needs the DB
+        self._intent_handlers = self._build_intent_handlers()
         
         print("✅ Flow Manager Ready.")
 
+    def invalidate(self):
+        """Refresh the database lookups (state manager and product matcher); call after changing mock_db."""
+        self.state_manager.invalidate()
+        self.entity_extractor.invalidate()
+
+    def _build_intent_handlers(self):
+        """
+        Intent -> handler(user_id, text, mood) for a message with no active ticket.
+        
+        Each handler returns (ticket, reply): the new ticket, plus a reply when
+        the conversation ends right away (handoff). Standard intents get a
+        closure with their required entities bound once, instead of looking
+        the config up per email.
+        """
+        def opener(intent, required_entities):
+            required_entities = tuple(required_entities)
+            
+            def open_ticket(user_id, text, mood):
+                ticket = self.ticket_manager.create_ticket(
+                    user_id=user_id,
+                    intent=intent,
+                    mood=mood,
+                    entities={},
+                    missing_fields=list(required_entities),
+                    severity=self.ticket_manager.calculate_severity(mood)
+                )
+                ticket.add_message("user", text)
+                return ticket, None
+            return open_ticket
+        
+        handlers = {
+            intent: opener(intent, config.get("required_entities", []))
+            for intent, config in self.intent_config.items()
+        }
+        # FAQ FALLBACK: an FAQ-type (or unrecognised) message reaching this point means
+        # the FAQ engine found no answer, so a human takes over
+        handlers["general_faq_question"] = handlers["unknown"] = self._open_handoff
+        return handlers
+
+    def _open_handoff(self, user_id, text, mood):
+        """Create a human handoff ticket holding the query and reply with its number."""
+        logger.debug("⚠️ FAQ Failed. Creating Human Handoff Ticket.")
+        severity = self.ticket_manager.calculate_severity(mood)
+        ticket = self.ticket_manager.create_ticket(
+            user_id=user_id,
+            intent="human_handoff",
+            mood=mood,
+            entities={"query": text}, # Store the query
+            missing_fields=[],
+            severity=severity
+        )
+        ticket.add_message("user", text)
+        
+        # Immediate Response for Handoff (Using Template)
+        return ticket, self.template_engine.render("email_unknown_intent.j2", {
+            "context": {
+                "ticket_id": ticket.ticket_id,
+                "severity": severity
+            }
+        })
+
+    @staticmethod
+    def _unknown_request(user_id, text, mood):
+        """Handler for intents without a config entry: no ticket, ask to rephrase."""
+        return None, "I'm sorry, I didn't understand that request. Could you rephrase?"
+
+    def prime(self, items):
+        """
+        Batch-score texts so process_email on each of them only hits caches.
+        
+        Mood is needed on every turn; FAQ and intent only for users without a
+        ticket that is still collecting fields (state as of now: extra scores
+        are harmless, they just stay cached).
+        
+        Args:
+            items (list): (user_id, text) tuples
+        """
+        fresh = []
+        for user_id, text in items:
+            ticket = self.ticket_manager.get_ticket(user_id)
+            if not (ticket and ticket.missing_fields):
+                fresh.append(text)
+        if fresh:
+            self.faq_engine.prime(fresh)
+            self.classifier.predict_batch(fresh)
+        self.classifier.predict_mood_batch([text for _, text in items])
+
     def process_email(self, user_id, text):
         """
         Process an incoming email and generate a response.
         
+        Ticket changes are buffered in the TicketManager and written once,
+        when the email is done (also if processing raised).
+        
         Args:
             user_id (str): Unique identifier for the user (email address)
             text (str): The content of the email
@@ -52,17 +161,28 @@ class FlowManager:
         Returns:
             str: The generated response text
         """
-        print(f"\n📨 Processing Email from {user_id}: '{text}'")
+        try:
+            return self._process_email(user_id, text)
+        finally:
+            self.ticket_manager.flush()
+
+    def _process_email(self, user_id, text):
+        """process_email without the final ticket flush."""
+        logger.debug("📨 Processing Email from %s: %r", user_id, text)
+        
+        ticket = self.ticket_manager.get_ticket(user_id)
         
         # --- STEP 1: FAQ CHECK (The Fast Lane) ---
-        # Only check FAQ if there is no active ticket (or if the user asks something totally new)
-        # For simplicity, we check FAQ first. If high confidence, we answer.
-        faq_match = self.faq_engine.get_best_match(text, threshold=0.60) # High threshold for auto-reply
-        if faq_match:
-            print(f"   ✅ FAQ Match Found: {faq_match['id']}")
-            # We can wrap this in a template too if we want, but raw text is fine for now
-            # Or use a generic 'faq_reply.j2'
-            return faq_match['answer']
+        # Skipped while a ticket is collecting missing fields: the reply is slot-filling
+        # data ("It is #1001"), so the FAQ search would be wasted work.
+        # Otherwise (no ticket, or e.g. a handoff ticket) a confident FAQ match is answered.
+        if not (ticket and ticket.missing_fields):
+            faq_match = self.faq_engine.get_best_match(text, threshold=0.60) # High threshold for auto-reply
+            if faq_match:
+                logger.debug("✅ FAQ Match Found: %s", faq_match['id'])
+                # We can wrap this in a template too if we want, but raw text is fine for now
+                # Or use a generic 'faq_reply.j2'
+                return faq_match['answer']
         
         # --- STEP 1.5: FAQ FALLBACK (Human Handoff) ---
         # If no FAQ match, but we haven't classified intent yet.
@@ -70,10 +190,8 @@ class FlowManager:
         # then we create a ticket for human vendor.
 
         # --- STEP 2: TICKET & INTENT MANAGEMENT ---
-        ticket = self.ticket_manager.get_ticket(user_id)
-        
         if ticket:
-            print(f"   🎫 Active Ticket Found: {ticket.ticket_id} ({ticket.status})")
+            logger.debug("🎫 Active Ticket Found: %s (%s)", ticket.ticket_id, ticket.status)
             # Update Ticket with new text (history)
             ticket.add_message("user", text)
             
@@ -85,99 +203,53 @@ class FlowManager:
             ticket.mood = mood # Update mood
             
         else:
-            print("   🆕 No Active Ticket. Classifying Intent...")
+            logger.debug("🆕 No Active Ticket. Classifying Intent...")
             # Classify Intent
-            intent, confidence = self.classifier.predict(text)
-            mood = self.classifier.predict_mood(text)
+            intent, confidence, mood = self.classifier.predict_joint(text)
             
-            print(f"   🧠 Intent: {intent} ({confidence:.2f}) | Mood: {mood}")
+            logger.debug("🧠 Intent: %s (%.2f) | Mood: %s", intent, confidence, mood)
             
-            # Check Config for Requirements
-
-            config = self.intent_config.get(intent)
-            
-            # FAQ FALLBACK LOGIC
-            # If intent is 'general_faq_question' (or similar) but we are here, it means FAQ Engine failed.
-            # OR if confidence is low.
-            if intent == "general_faq_question" or intent == "unknown":
-                print(f"   ⚠️ FAQ Failed & Intent is '{intent}'. Creating Human Handoff Ticket.")
-                intent = "human_handoff"
-                required_entities = [] # No specific entities needed, just the query
-                
-                # Create Ticket with Severity
-                severity = self.ticket_manager.calculate_severity(mood)
-                ticket = self.ticket_manager.create_ticket(
-                    user_id=user_id,
-                    intent=intent,
-                    mood=mood,
-                    entities={"query": text}, # Store the query
-                    missing_fields=[],
-                    severity=severity
-                )
-                ticket.add_message("user", text)
-                
-                # Immediate Response for Handoff (Using Template)
-                return self.template_engine.render("email_unknown_intent.j2", {
-                    "context": {
-                        "ticket_id": ticket.ticket_id,
-                        "severity": severity
-                    }
-                })
-
-            if not config:
-                return "I'm sorry, I didn't understand that request. Could you rephrase?"
-                
-            required_entities = config.get("required_entities", [])
-            
-            # Create Ticket (Standard Flow)
-            severity = self.ticket_manager.calculate_severity(mood)
-            ticket = self.ticket_manager.create_ticket(
-                user_id=user_id,
-                intent=intent,
-                mood=mood,
-                entities={},
-                missing_fields=required_entities,
-                severity=severity
-            )
-            ticket.add_message("user", text)
+            # Open the intent's ticket (or hand off / give up) via its prebuilt handler
+            handler = self._intent_handlers.get(intent, self._unknown_request)
+            ticket, reply = handler(user_id, text, mood)
+            if reply is not None:
+                return reply
 
         # --- STEP 3: ENTITY EXTRACTION & SLOT FILLING ---
         # Try to extract missing fields from the current text
         if ticket.missing_fields:
-            print(f"   🔍 Looking for missing fields: {ticket.missing_fields}")
+            logger.debug("🔍 Looking for missing fields: %s", ticket.missing_fields)
             # We only look for what is missing to avoid overwriting good data with bad guesses
             # But EntityExtractor.run_extraction takes a list.
             
             # Note: We pass the WHOLE text.
-            extracted = EntityExtractor.run_extraction(
-                text, 
-                ticket.missing_fields, 
-                self.mock_db # Needed for product lookup
-            )
+            extracted = self.entity_extractor.extract(text, ticket.missing_fields)
             
-            if extracted:
-                print(f"   ✨ Extracted: {extracted}")
+            # Only write the ticket back if the reply actually changed a field
+            current = ticket.extracted_entities
+            if any(current.get(k) != v for k, v in extracted.items()):
+                logger.debug("✨ Extracted: %s", extracted)
                 ticket.update_entities(extracted)
-                self.ticket_manager.update_ticket(ticket)
+                self.ticket_manager.mark_dirty(ticket)
 
         # --- STEP 4: DECISION & RESPONSE ---
         
-        # Context for Templates
+        # Context for Templates (name guessed once per ticket)
         context = {
-            "user_name": user_id.split('@')[0].title(), # Simple name guess
+            "user_name": ticket.user_name,
             "mood": ticket.mood,
-            "data": ticket.extracted_entities,
             "missing_fields": ticket.missing_fields
         }
 
         if ticket.is_complete():
-            print("   ✅ Ticket Complete. Executing Action...")
+            logger.debug("✅ Ticket Complete. Executing Action...")
+            context["data"] = ticket.extracted_entities  # Only the action templates read data
             
             # EDGE CASE 3: System Error Handling
             try:
                 # Execute Action via StateManager
                 action_result = self.state_manager.process_request(ticket.intent, ticket.extracted_entities)
-                print(f"   [DEBUG] Action Result: {action_result}")
+                logger.debug("Action Result: %s", action_result)
                 
                 # Update Context with Action Result
                 context["state"] = action_result["state"]
@@ -186,31 +258,25 @@ class FlowManager:
                 # Handle Specific Error States from StateManager
                 if action_result["state"] == "error":
                      # Could be DB error or Config error
-                     print("   ❌ System Error Detected.")
+                     logger.error("❌ System Error Detected (ticket %s).", ticket.ticket_id)
                      return self.template_engine.render("email_system_error.j2", {
                          "context": {"ticket_id": ticket.ticket_id}
                      })
                 elif action_result["state"] == "invalid_format":
                      # EDGE CASE 2: Invalid Data Format
-                     print(f"   ⚠️ Invalid Format: {action_result.get('missing', 'Unknown Field')}")
+                     logger.debug("⚠️ Invalid Format: %s", action_result.get('missing', 'Unknown Field'))
                      return self.template_engine.render("email_invalid_format.j2", {
                          "data": {"field_name": action_result.get("missing", ["Unknown"])[0]}
                      })
 
             except Exception as e:
-                print(f"   ❌ CRITICAL SYSTEM ERROR: {e}")
+                logger.error("❌ CRITICAL SYSTEM ERROR: %s", e)
                 return self.template_engine.render("email_system_error.j2", {
                     "context": {"ticket_id": ticket.ticket_id}
                 })
             
-            # Select Template based on Intent
-            # We need a mapping or convention. 
-            # Convention: 'email_{intent}.j2' ? Or just hardcode for now.
-            template_name = "email_base.j2" # Fallback
-            
-            if ticket.intent == "order_status_inquiry":
-                template_name = "email_order_status.j2"
-            # Add more mappings here as we add templates
+            # Select Template based on Intent (email_base.j2 as fallback)
+            template_name = self._intent_to_template.get(ticket.intent, "email_base.j2")
             
             response = self.template_engine.render(template_name, context)
             
@@ -225,10 +291,10 @@ class FlowManager:
                 self.ticket_manager.close_ticket(user_id)
                 
         else:
-            print("   Warning: Ticket Incomplete. Requesting Info...")
+            logger.debug("Ticket Incomplete. Requesting Info...")
             # Ticket still missing info
             ticket.status = "PENDING_CUSTOMER"
-            self.ticket_manager.update_ticket(ticket)
+            self.ticket_manager.mark_dirty(ticket)
             
             response = self.template_engine.render("email_request_info.j2", context)
 
@@ -239,6 +305,7 @@ class FlowManager:
 
 if __name__ == "__main__":
     # Test Logic
+    logging.basicConfig(level=logging.DEBUG, format="   %(message)s")
     manager = FlowManager()
     
     # Scenario 1: FAQ
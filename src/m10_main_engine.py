@@ -9,24 +9,147 @@ Integrates:
 
 import os
 import sys
+import asyncio
+import logging
+import threading
+import weakref
 
 # Add project root to path for imports
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.m09_flow_manager import FlowManager
-from src.m08_gemini_evaluation import ComplianceEngine
-
 # =============================================================================
 # GLOBAL CONFIGURATION & SETUP
 # =============================================================================
 
-print("--- JUNO ENGINE INITIALIZING ---")
+# Pipeline logs are quiet by default; set JUNO_DEBUG=1 for the per-email trace
+DEBUG_ENV = "JUNO_DEBUG"
+
+
+def configure_logging():
+    """
+    Set up root logging for the CLI and scripts (JUNO_DEBUG=1 shows the trace).
+    
+    Not done at import, so applications embedding this module keep their own setup.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG if os.environ.get(DEBUG_ENV) == "1" else logging.WARNING,
+        format="   %(message)s"
+    )
+
+
+# Core engines are built on first use, so importing this module is cheap
+_flow_manager = None
+_compliance_engine = None
+
+# One AsyncBatcher per event loop: its timer and futures belong to the loop that
+# created them, so a later asyncio.run() must not reuse them
+_prime_batchers = weakref.WeakKeyDictionary()
+
+# FlowManager state (tickets, inference caches) is not thread-safe; async callers take turns
+_pipeline_lock = threading.Lock()
+
+# Guards the lazy engine construction above (callers may race on a cold start)
+_init_lock = threading.Lock()
+
+
+def get_flow_manager():
+    """Return the shared FlowManager, loading models on the first call."""
+    global _flow_manager
+    if _flow_manager is None:
+        with _init_lock:
+            if _flow_manager is None:  # Another thread may have built it meanwhile
+                from src.m09_flow_manager import FlowManager
+                print("--- JUNO ENGINE INITIALIZING ---")
+                _flow_manager = FlowManager(project_root)
+    return _flow_manager
+
+
+def get_compliance_engine():
+    """Return the shared ComplianceEngine (uses env var or fails open)."""
+    global _compliance_engine
+    if _compliance_engine is None:
+        with _init_lock:
+            if _compliance_engine is None:
+                from src.m08_gemini_evaluation import ComplianceEngine
+                _compliance_engine = ComplianceEngine()
+    return _compliance_engine
+
+
+class AsyncBatcher:
+    """
+    Coalesces concurrent awaits into one batched call.
+    
+    Items passed to run() within max_wait_ms of each other (up to max_batch)
+    are handed to process_batch(items) together in a worker thread, and each
+    caller gets its own result back.
+    """
+    
+    def __init__(self, process_batch, max_batch=32, max_wait_ms=20):
+        """
+        Args:
+            process_batch (callable): list of items -> list of results, same order
+            max_batch (int): Flush as soon as this many items are waiting
+            max_wait_ms (float): Longest an item waits for others to join
+        """
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._timer = None
+        self._tasks = set()  # Strong refs so running batches aren't garbage collected
+    
+    async def run(self, item):
+        """Queue item for the next batch and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, self.process_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
-# Initialize Core Engines
-flow_manager = FlowManager(project_root)
-compliance_engine = ComplianceEngine() # Will use env var or fail open
+
+def _get_prime_batcher():
+    """The running loop's AsyncBatcher for _prime, created on first use."""
+    loop = asyncio.get_running_loop()
+    batcher = _prime_batchers.get(loop)
+    if batcher is None:
+        batcher = _prime_batchers[loop] = AsyncBatcher(_prime)
+    return batcher
+
+
+def _prime(emails):
+    """Batch-score (user_id, email_text) tuples so per-email processing only hits caches."""
+    flow_manager = get_flow_manager()
+    with _pipeline_lock:
+        flow_manager.prime(emails)
+    return [None] * len(emails)
 
 # =============================================================================
 # MAIN PIPELINE
@@ -47,9 +170,19 @@ def process_incoming_email(user_id, email_text):
     Returns:
         str: Final vetted response text
     """
+    # 1. GENERATE DRAFT (Flow Manager)
+    draft_response, current_mood = _draft_response(user_id, email_text)
+    
+    # 2. VET RESPONSE (Compliance Layer)
+    final_response = get_compliance_engine().vet_response(draft_response, mood=current_mood)
+    return _report_sent(draft_response, final_response)
+
+
+def _draft_response(user_id, email_text):
+    """Run FlowManager on one email: (draft text, customer mood for compliance)."""
     print(f"\n📨 NEW MESSAGE from {user_id}: '{email_text}'")
+    flow_manager = get_flow_manager()
     
-    # 1. GENERATE DRAFT (Flow Manager)
     # This handles everything: FAQ, Tickets, Database, Templates
     draft_response = flow_manager.process_email(user_id, email_text)
     
@@ -59,10 +192,10 @@ def process_incoming_email(user_id, email_text):
     current_mood = ticket.mood if ticket else "Neutral"
     
     print(f"   📝 Draft Generated (Mood: {current_mood})")
-    
-    # 2. VET RESPONSE (Compliance Layer)
-    final_response = compliance_engine.vet_response(draft_response, mood=current_mood)
-    
+    return draft_response, current_mood
+
+
+def _report_sent(draft_response, final_response):
     if final_response != draft_response:
         print("   🛡️  Compliance Engine modified the response.")
     
@@ -71,15 +204,63 @@ def process_incoming_email(user_id, email_text):
     return final_response
 
 
-if __name__ == "__main__":
-    # --- TEST CASES ---
+def process_incoming_emails(emails):
+    """
+    Process a batch of emails through the JUNO pipeline.
+    
+    All texts are first scored together (one MiniLM call each for the
+    FAQ engine and the intent classifier, batched SetFit for mood) so the
+    per-email pipeline below only hits caches. Emails are then handled in order, since earlier
+    messages can open tickets that later ones continue.
+    
+    Args:
+        emails (list): (user_id, email_text) tuples
+        
+    Returns:
+        list: Final vetted response text per email, in order
+    """
+    _prime(emails)
+    return [process_incoming_email(user_id, text) for user_id, text in emails]
+
+
+def _draft_locked(user_id, email_text):
+    with _pipeline_lock:
+        return _draft_response(user_id, email_text)
+
+
+async def process_incoming_email_async(user_id, email_text):
+    """
+    Async process_incoming_email for servers handling concurrent requests.
     
-    # 1. FAQ
-    process_incoming_email("alice@example.com", "What is your return policy?")
+    Emails arriving within ~20 ms of each other are scored in one batch
+    (see AsyncBatcher); each draft is then built in a worker thread, one at
+    a time, so ticket updates never interleave. Compliance vetting runs
+    outside that lock and is awaited, so Gemini round trips of concurrent
+    emails overlap each other and the next drafts.
+    
+    Args:
+        user_id (str): Unique identifier for the user (email address)
+        email_text (str): The customer email text to process
+        
+    Returns:
+        str: Final vetted response text
+    """
+    await _get_prime_batcher().run((user_id, email_text))
+    loop = asyncio.get_running_loop()
+    draft_response, current_mood = await loop.run_in_executor(None, _draft_locked, user_id, email_text)
+    final_response = await get_compliance_engine().vet_response_async(draft_response, mood=current_mood)
+    return _report_sent(draft_response, final_response)
+
+
+if __name__ == "__main__":
+    configure_logging()
     
-    # 2. Transaction (Happy Path)
-    process_incoming_email("charlie@example.com", "Where is my order #12345?")
+    # --- TEST CASES ---
+    test_emails = [
+        ("alice@example.com", "What is your return policy?"),            # 1. FAQ
+        ("charlie@example.com", "Where is my order #12345?"),            # 2. Transaction (Happy Path)
+        ("dave@example.com", "I am furious! Where is my package?"),      # 3. Transaction (Slot Filling + Angry)
+        ("dave@example.com", "It is #99999"),                            #    Not found scenario
+    ]
     
-    # 3. Transaction (Slot Filling + Angry)
-    process_incoming_email("dave@example.com", "I am furious! Where is my package?")
-    process_incoming_email("dave@example.com", "It is #99999") # Not found scenario
+    process_incoming_emails(test_emails)
@@ -0,0 +1,306 @@
+"""
+Sentence embedding module for the JUNO Automation Engine.
+Serves all-MiniLM-L6-v2 through ONNX Runtime (int8) when an exported model exists,
+falling back to the stock sentence-transformers model otherwise (FP16 on CUDA/MPS).
+"""
+
+import os
+import hashlib
+import weakref
+import threading
+import importlib.util
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+
+# Checked without importing: onnxruntime/transformers are only loaded if an export is used
+HAS_ONNX = all(importlib.util.find_spec(m) is not None for m in ("onnxruntime", "transformers"))
+
+EMBEDDER_NAME = "all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = "model_int8.onnx"
+
+# Set JUNO_NO_CACHE=1 to always re-encode instead of loading models/<prefix>_<hash>.npy
+NO_CACHE_ENV = "JUNO_NO_CACHE"
+
+# Set JUNO_TORCH_COMPILE=1 to torch.compile the PyTorch transformer (slow first call, torch>=2.0)
+TORCH_COMPILE_ENV = "JUNO_TORCH_COMPILE"
+
+# FlowManager loads its components in parallel threads; only one may load the model
+_embedder_lock = threading.Lock()
+
+# Distinct query texts whose embedding is kept per embedder (shared by intent and FAQ)
+QUERY_CACHE_SIZE = 4096
+
+
+class OnnxEmbedder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by ONNX Runtime.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline: tokenize -> transformer ->
+    attention-masked mean pooling -> L2 normalisation.
+    """
+
+    def __init__(self, onnx_dir, model_file=ONNX_MODEL_FILE):
+        """
+        Load the quantized model and its tokenizer.
+
+        Args:
+            onnx_dir (str): Directory produced by scripts/export_onnx_embedder.py
+            model_file (str): ONNX file to serve from that directory
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count() or 0  # 0 lets ORT decide
+        self.session = ort.InferenceSession(
+            os.path.join(onnx_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        """
+        Encode one sentence or a list of sentences.
+
+        Args:
+            sentences (str or list): Input text(s)
+            batch_size (int): Sentences per ONNX Runtime call
+
+        Returns:
+            np.ndarray: (dim,) for a single string, (n, dim) for a list
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Batch similar lengths together to minimise padding (as SentenceTransformer does)
+        order = np.argsort([len(s) for s in sentences], kind="stable")
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True, max_length=256, return_tensors="np")
+            feeds = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (non-padding) tokens, kept in contiguous float32
+            token_embeddings = np.ascontiguousarray(token_embeddings, dtype=np.float32)
+            mask = tokens["attention_mask"].astype(np.float32)
+            pooled = np.einsum("bsd,bs->bd", token_embeddings, mask, optimize=True)
+            pooled /= np.clip(mask.sum(axis=1, keepdims=True), 1.0, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled)
+
+        if not batches:
+            return np.zeros((0, 384), dtype=np.float32)
+        embeddings = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)  # Back to input order
+        return embeddings[0] if single else embeddings
+
+
+def load_sentence_transformer(model_name=EMBEDDER_NAME):
+    """
+    Load a SentenceTransformer on the best available device.
+
+    CUDA or Apple MPS get the model in FP16 (half the weight traffic, cosine
+    scores shift by ~1e-3); CPU keeps FP32, where half precision is slower.
+    With JUNO_TORCH_COMPILE=1 the transformer is also compiled with
+    torch.compile so its layers run as fused kernels.
+
+    Args:
+        model_name (str): sentence-transformers model id
+
+    Returns:
+        SentenceTransformer: The loaded model
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if torch.cuda.is_available():
+        device = "cuda"
+    elif getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        device = "mps"
+    else:
+        device = "cpu"
+
+    model = SentenceTransformer(model_name, device=device)
+    if device != "cpu":
+        model = model.half()
+    if os.environ.get(TORCH_COMPILE_ENV) == "1" and hasattr(torch, "compile"):
+        # dynamic=True: batches vary in sequence length, avoid a recompile per shape
+        model[0].auto_model = torch.compile(model[0].auto_model, dynamic=True)
+    print(f"✅ Embedder: PyTorch on {device}{' (fp16)' if device != 'cpu' else ''}.")
+    return model
+
+
+def load_embedder(model_dir):
+    """
+    Return the fastest available MiniLM embedder.
+
+    Uses models/onnx_minilm/model_int8.onnx when onnxruntime is installed and
+    the export exists; otherwise loads the PyTorch SentenceTransformer
+    (on GPU when one is available).
+
+    Args:
+        model_dir (str): Project models directory
+
+    Returns:
+        object: Embedder exposing a SentenceTransformer-style encode()
+    """
+    onnx_dir = os.path.join(model_dir, "onnx_minilm")
+    if HAS_ONNX and os.path.exists(os.path.join(onnx_dir, ONNX_MODEL_FILE)):
+        try:
+            embedder = OnnxEmbedder(onnx_dir)
+            print("✅ Embedder: ONNX Runtime (int8).")
+            return embedder
+        except Exception as e:
+            print(f"⚠️ Failed to load ONNX embedder: {e}. Using PyTorch.")
+
+    return load_sentence_transformer(EMBEDDER_NAME)
+
+
+def cached_encode(encode, model_dir, prefix, key_parts, rows, mmap=True):
+    """
+    Return encode()'s float32 matrix, cached on disk between runs.
+
+    The file is <model_dir>/<prefix>_<hash>.npy, hashed over key_parts, so
+    callers include everything the vectors depend on (input text, model
+    name, embedder backend). With mmap the matrix is served read-only from
+    the mapped file, also right after writing it, so processes share pages.
+
+    Args:
+        encode (callable): Computes the (rows, dim) matrix on a cache miss
+        model_dir (str): Directory holding the cache files
+        prefix (str): Cache file name prefix
+        key_parts (list): str/bytes values identifying the contents
+        rows (int): Expected row count (a mismatch re-encodes)
+        mmap (bool): Memory-map instead of loading a private copy
+
+    Returns:
+        np.ndarray: The cached or freshly encoded matrix
+    """
+    if os.environ.get(NO_CACHE_ENV) == "1":
+        return encode()
+
+    digest = hashlib.blake2b()
+    for part in key_parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    cache_path = os.path.join(model_dir, f"{prefix}_{digest.hexdigest()[:16]}.npy")
+    if os.path.exists(cache_path):
+        embeddings = np.load(cache_path, mmap_mode="r" if mmap else None)
+        if embeddings.shape[0] == rows:
+            print(f"⚡ Loaded cached embeddings: {cache_path}")
+            return embeddings
+
+    embeddings = encode()
+    try:
+        tmp_path = cache_path + ".tmp.npy"
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, cache_path)
+        if mmap:
+            embeddings = np.load(cache_path, mmap_mode="r")
+    except OSError as e:
+        print(f"⚠️ Could not cache embeddings: {e}")
+    return embeddings
+
+
+@lru_cache(maxsize=None)
+def _shared_embedder(model_dir):
+    return load_embedder(model_dir)
+
+
+def get_embedder(model_dir):
+    """
+    Process-wide embedder for model_dir, loaded on first use.
+
+    The intent classifier and FAQ engine encode with the same MiniLM model,
+    so they share one instance (one set of weights, one cold start).
+
+    Args:
+        model_dir (str): Project models directory
+
+    Returns:
+        object: Embedder exposing a SentenceTransformer-style encode()
+    """
+    with _embedder_lock:
+        return _shared_embedder(os.path.abspath(model_dir))
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU of unit-norm query embeddings for one embedder.
+
+    Texts are keyed lowercased with whitespace collapsed (MiniLM is
+    uncased, so the embedding is the same), which lets the FAQ engine and
+    the intent classifier reuse one forward pass for the same email.
+    """
+
+    def __init__(self, embedder, maxsize=QUERY_CACHE_SIZE):
+        self.embedder = embedder
+        self.maxsize = maxsize
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text):
+        return " ".join(text.split()).lower()
+
+    def encode(self, texts):
+        """
+        Embed texts, encoding only the ones not seen recently (in one call).
+
+        Args:
+            texts (list): Query strings
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32, L2-normalised, read-only rows
+        """
+        keys = [self.key(t) for t in texts]
+        with self._lock:
+            found = {}
+            for k in keys:
+                vec = self._vectors.get(k)
+                if vec is not None:
+                    self._vectors.move_to_end(k)
+                    found[k] = vec
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            vectors = np.asarray(self.embedder.encode(
+                missing, batch_size=len(missing), convert_to_numpy=True, normalize_embeddings=True
+            ), dtype=np.float32)
+            vectors.setflags(write=False)  # Rows are handed out to both callers
+            with self._lock:
+                for k, vec in zip(missing, vectors):
+                    found[k] = vec
+                    self._vectors[k] = vec
+                while len(self._vectors) > self.maxsize:
+                    self._vectors.popitem(last=False)
+        if not keys:
+            return np.zeros((0, 384), dtype=np.float32)
+        return np.stack([found[k] for k in keys])
+
+
+_query_caches = weakref.WeakKeyDictionary()
+
+
+def get_query_cache(embedder):
+    """
+    The QueryEmbeddingCache of embedder, created on first use.
+
+    Components holding the same (shared) embedder get the same cache.
+
+    Args:
+        embedder (object): Embedder exposing a SentenceTransformer-style encode()
+
+    Returns:
+        QueryEmbeddingCache: Cache wrapping that embedder
+    """
+    with _embedder_lock:
+        cache = _query_caches.get(embedder)
+        if cache is None:
+            cache = _query_caches[embedder] = QueryEmbeddingCache(embedder)
+        return cache
@@ -3,6 +3,43 @@ Response generation module for the JUNO Automation Engine.
 Fills templates from response_templates.json to generate responses.
 """
 
+import string
+
+_FORMATTER = string.Formatter()
+
+# raw template text -> preparsed (literal, field, spec, conversion) segments,
+# or None when the template needs the full str.format machinery
+_PARSED_TEMPLATES = {}
+
+
+def _parse_template(raw_text):
+    """Parse a template's placeholders once and reuse the result."""
+    if raw_text not in _PARSED_TEMPLATES:
+        segments = tuple(_FORMATTER.parse(raw_text))
+        simple = all(
+            field is None or (field.isidentifier() and "{" not in (spec or ""))
+            for _, field, spec, _ in segments
+        )
+        _PARSED_TEMPLATES[raw_text] = segments if simple else None
+    return _PARSED_TEMPLATES[raw_text]
+
+
+def _fill(raw_text, data):
+    """Equivalent of raw_text.format(**data) using the preparsed segments."""
+    segments = _parse_template(raw_text)
+    if segments is None:
+        return raw_text.format(**data)
+
+    parts = []
+    for literal, field, spec, conversion in segments:
+        parts.append(literal)
+        if field is not None:
+            value = data[field]  # KeyError on missing fields, same as str.format
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            parts.append(format(value, spec or ""))
+    return "".join(parts)
+
 
 class ResponseEngine:
     """Fills the templates from response_templates.json."""
@@ -32,12 +69,12 @@ class ResponseEngine:
             
         elif state == "not_found":
             raw_text = intent_templates.get("not_found", "Record not found.")
-            return raw_text.format(**data)
+            return _fill(raw_text, data)
             
         elif state == "success":
             raw_text = intent_templates.get("success", "Request processed.")
             try:
-                return raw_text.format(**data)
+                return _fill(raw_text, data)
             except KeyError as e:
                 return f"System Error: Missing data field {e}"
         